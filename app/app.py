@@ -1,34 +1,348 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g
+from flask.json.provider import DefaultJSONProvider
+from markupsafe import Markup
+from collections.abc import Mapping
+from contextlib import contextmanager
+import hashlib
+import hmac
 import os
-from data_service import get_player_stats, get_player_by_id, compare_players, get_weekly_player_stats, get_available_weeks, compare_players_weekly
+import time
+from render_cache import RenderCache
+from export import FORMATS, iter_export
+from metrics import Registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from memory_report import memory_report, tracer
+from data_service import get_player_stats, get_player_by_id, compare_players, get_weekly_player_stats, get_available_weeks, compare_players_weekly, query_players, get_player_history, compare_player_groups, project_rows
+from data_service import store, comparison_cache, serialized_counts, weekly_signature
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class DataJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that also serializes read-only row views (e.g. columnar TableRows),
+    using orjson for compact output when it is installed.
+    """
+    @staticmethod
+    def default(o):
+        if isinstance(o, Mapping):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
+    
+    def dumps(self, obj, **kwargs):
+        # Indented (debug) output and other custom options go through the json module
+        if orjson is not None and kwargs.get('indent') is None:
+            return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS).decode('utf-8')
+        return super().dumps(obj, **kwargs)
 
 app = Flask(__name__)
+app.json = DataJSONProvider(app)
+# Cache-Control for responses tied to a dataset version: endpoint -> (max-age,
+# stale-while-revalidate) in seconds. Once max-age has passed, clients and the proxy
+# revalidate with the dataset ETag and get a 304 until new data is deployed.
+# Override with e.g. FLASK_CACHE_POLICIES='{"display_stats": [0, 600]}'.
+app.config['CACHE_POLICIES'] = {
+    'display_stats': (60, 86400),
+    'compare_page': (60, 86400),
+    'mock_draft': (60, 86400),
+    'get_players_api': (300, 86400),
+    'compare_api': (300, 86400),
+    'player_history_api': (300, 86400),
+}
+# Token required (as an X-Debug-Token header) by the /debug endpoints, which are disabled
+# without one; set with FLASK_DEBUG_TOKEN
+app.config['DEBUG_TOKEN'] = None
+app.config.from_prefixed_env()
+render_cache = RenderCache()
+
+def use_dataset_version(version, modified=None):
+    """Mark the current response as determined by a dataset version; see add_header."""
+    g.dataset_version = version
+    g.dataset_modified = modified
+
+# Request metrics, served in the Prometheus format at /metrics
+metrics = Registry()
+request_latency = metrics.histogram('mls_http_request_duration_seconds',
+                                    'Time to handle a request until its response is returned',
+                                    ('endpoint', 'method'))
+request_count = metrics.counter('mls_http_requests_total', 'Requests handled', ('endpoint', 'method', 'status'))
+request_phases = metrics.histogram('mls_http_request_phase_seconds',
+                                   'Time spent loading data, computing and rendering', ('endpoint', 'phase'))
+metrics.callback('mls_cache_hits_total', 'Lookups answered from a cache', lambda: {
+    ('render',): render_cache.hits,
+    ('comparison',): comparison_cache.hits,
+    ('serialized',): serialized_counts['hits'],
+    ('week_store',): store.week_hits,
+}, ('cache',), type='counter')
+metrics.callback('mls_cache_misses_total', 'Lookups that had to compute or load their result', lambda: {
+    ('render',): render_cache.misses,
+    ('comparison',): comparison_cache.misses,
+    ('serialized',): serialized_counts['misses'],
+    ('week_store',): store.week_loads,
+}, ('cache',), type='counter')
+metrics.callback('mls_week_store_evictions_total', 'Weeks evicted to stay within the memory budget',
+                 lambda: store.week_evictions, type='counter')
+metrics.callback('mls_dataset_reloads_total', 'Datasets reloaded after their files changed',
+                 lambda: store.reloads, type='counter')
+metrics.callback('mls_dataset_rows', 'Rows in each loaded dataset',
+                 lambda: {(name,): len(data) for name, data in store.loaded().items()}, ('dataset',))
+metrics.callback('mls_dataset_bytes', 'Estimated bytes held by each loaded dataset',
+                 lambda: {(name,): data.nbytes for name, data in store.loaded().items()}, ('dataset',))
+metrics.callback('mls_week_store_bytes', 'Estimated bytes held by the loaded weeks', lambda: store.week_nbytes)
+metrics.callback('mls_week_store_budget_bytes', 'Memory budget of the week store', lambda: store.week_budget)
+metrics.callback('mls_render_cache_pages', 'Rendered pages cached', lambda: len(render_cache))
+metrics.callback('mls_render_cache_bytes', 'Bytes of cached page bodies in every encoding',
+                 lambda: render_cache.nbytes)
+metrics.callback('mls_comparison_cache_entries', 'Comparisons cached', lambda: len(comparison_cache))
+
+@contextmanager
+def phase(name):
+    """Time part of a request (load, compute or render) for its Server-Timing header and metrics."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.timings[name] = g.timings.get(name, 0) + time.perf_counter() - start
+
+def request_dataset(week):
+    """Return the requested week's dataset, or the season's without a week, timed as loading."""
+    with phase('load'):
+        return get_weekly_player_stats(week) if week else get_player_stats()
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+    g.timings = {}
+
+# Registered before add_header, so it runs after it and sees the final status (e.g. 304)
+@app.after_request
+def record_request(response):
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.endpoint or 'unmatched'
+    request_latency.observe(elapsed, endpoint, request.method)
+    request_count.inc(endpoint, request.method, str(response.status_code))
+    timings = []
+    for name, seconds in g.timings.items():
+        request_phases.observe(seconds, endpoint, name)
+        timings.append(f"{name};dur={seconds * 1000:.2f}")
+    timings.append(f"total;dur={elapsed * 1000:.2f}")
+    response.headers['Server-Timing'] = ', '.join(timings)
+    return response
+
+# Columns the page scripts read from the embedded player list
+PAGE_FIELDS = {
+    'compare.html': ('Player ID', 'Name', 'Team', 'Positions'),
+    'draft.html': ('Player ID', 'Name', 'Team', 'Positions', 'Cost', 'Total Points', 'Average Points', 'High Score'),
+}
+
+def html_safe_json(text):
+    """Make JSON text safe to embed in a <script> block, escaping as the tojson filter does."""
+    return Markup(text.replace('<', '\\u003c').replace('>', '\\u003e')
+                  .replace('&', '\\u0026').replace("'", '\\u0027'))
+
+def render_data_page(template):
+    """
+    Render a page over the requested week's data, serving it precompressed from
+    render_cache while the dataset and the list of weeks are unchanged.
+    Pages that embed the player list get it as compact JSON with only the columns they use.
+    """
+    route = request.endpoint
+    week = request.args.get('week')
+    data = request_dataset(week)
+    with phase('load'):
+        available_weeks = get_available_weeks()
+    # Only weeks that exist are cached, so arbitrary ?week= values cannot grow the cache
+    cacheable = bool(data.version) and (not week or week in available_weeks)
+    version = hashlib.sha1(repr((data.version, available_weeks)).encode('utf-8')).hexdigest()[:16]
+    
+    page = render_cache.get(route, week, version) if cacheable else None
+    if page is None:
+        with phase('render'):
+            ga_id = os.environ.get('GA_MEASUREMENT_ID', '')
+            fields = PAGE_FIELDS.get(template)
+            players_json = html_safe_json(data.to_json(fields, compact=True)) if fields and data else None
+            body = render_template(template, data=data, available_weeks=available_weeks,
+                                   selected_week=week, ga_measurement_id=ga_id, players_json=players_json)
+            if not cacheable:
+                return body
+            page = render_cache.put(route, week, version, body)
+    
+    encoding, body = page.negotiate(request.accept_encodings)
+    # Each encoding is a different representation, so it gets its own entity tag
+    use_dataset_version(version if encoding == 'identity' else f"{version}-{encoding}", data.modified)
+    response = app.response_class(body, mimetype='text/html')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
 
 @app.route('/')
 def display_stats():
     """Render the main page with player statistics."""
-    week = request.args.get('week')
-    data = get_weekly_player_stats(week) if week else get_player_stats()
-    available_weeks = get_available_weeks()
-    ga_id = os.environ.get('GA_MEASUREMENT_ID', '')
-    return render_template('index.html', data=data, available_weeks=available_weeks, 
-                         selected_week=week, ga_measurement_id=ga_id)
+    return render_data_page('index.html')
+
+def table_order(args, data):
+    """
+    Read the DataTables order[i][column]/order[i][dir] parameters as (column, descending)
+    pairs, resolving each column index through columns[n][data] or columns[n][name].
+    """
+    order = []
+    i = 0
+    while f'order[{i}][column]' in args:
+        index = args.get(f'order[{i}][column]')
+        descending = args.get(f'order[{i}][dir]', 'asc') == 'desc'
+        i += 1
+        for column in (args.get(f'columns[{index}][data]'), args.get(f'columns[{index}][name]')):
+            if column and data.has_column(column):
+                order.append((column, descending))
+                break
+    # Simpler form for scripts: sort=-Total Points,Name (a leading - sorts descending)
+    for column in args.get('sort', '').split(','):
+        column = column.strip()
+        descending = column.startswith('-')
+        column = column.lstrip('-')
+        if column and data.has_column(column):
+            order.append((column, descending))
+    return order
+
+# Minimum filters on the table page: parameter -> columns holding the stat, season name first
+MINIMUM_FILTERS = {
+    'min_goals': ('Actual Goals', 'Goals'),
+    'min_assists': ('Actual Assists', 'Assists'),
+    'min_points': ('Total Points',),
+}
+
+def table_filters(args):
+    """Read the table's search, position, team, price and minimum filters as query_players arguments."""
+    return {
+        'search': args.get('search[value]', args.get('search', '')),
+        'position': args.get('position', ''),
+        'team': args.get('team', ''),
+        'min_price': args.get('min_price', type=float),
+        'max_price': args.get('max_price', type=float),
+        'minimums': [
+            (columns, args.get(name, type=float))
+            for name, columns in MINIMUM_FILTERS.items() if args.get(name, type=float) is not None
+        ],
+    }
 
 @app.route('/api/players')
 def get_players_api():
-    """API endpoint to return player data as JSON."""
-    data = get_player_stats()
-    return jsonify(data)
+    """
+    API endpoint to return player data as JSON.
+    Requests carrying a DataTables draw parameter are answered in the server-side
+    processing format, filtered by search[value], position, team, min_price, max_price,
+    min_goals, min_assists and min_points.
+    fields=a,b,... limits the columns returned and format=compact sends a list of column
+    names plus one array of values per player instead of one object per player.
+    """
+    week = request.args.get('week')
+    data = request_dataset(week)
+    args = request.args
+    fields = [field.strip() for field in args.get('fields', '').split(',') if field.strip()]
+    unknown = [field for field in fields if not data.has_column(field)]
+    if data and unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    compact = args.get('format') == 'compact'
+    
+    if data.version:
+        use_dataset_version(data.version, data.modified)
+    if 'draw' not in args:
+        # Serialized once per dataset version and projection
+        with phase('render'):
+            return app.response_class(data.to_json(fields, compact), mimetype='application/json')
+    
+    with phase('compute'):
+        records_filtered, page = query_players(
+            data,
+            start=max(args.get('start', 0, type=int), 0),
+            length=args.get('length', -1, type=int),
+            order=table_order(args, data),
+            **table_filters(args),
+        )
+    with phase('render'):
+        response = {
+            'draw': args.get('draw', 0, type=int),
+            'recordsTotal': len(data),
+            'recordsFiltered': records_filtered,
+        }
+        if compact:
+            projected = project_rows(page, fields or (list(data[0]) if data else []), compact=True)
+            response['columns'], response['data'] = projected['columns'], projected['rows']
+        else:
+            response['data'] = project_rows(page, fields) if fields else page
+        return jsonify(response)
+
+@app.route('/api/export')
+def export_api():
+    """
+    Stream players matching the table's filters and sort as CSV or JSON Lines
+    (format=csv|jsonl), for the season or for one or more weeks (week=Week 3&week=Week 4,
+    or week=all). Weekly exports start each row with its week. Accepts fields= like
+    /api/players, and is gzip-compressed when the client accepts it.
+    """
+    args = request.args
+    export_format = args.get('format', 'csv')
+    if export_format not in FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(FORMATS)}"}), 400
+    
+    weeks = args.getlist('week')
+    available_weeks = get_available_weeks()
+    if weeks == ['all']:
+        weeks = available_weeks
+    unknown_weeks = [week for week in weeks if week not in available_weeks]
+    if unknown_weeks:
+        return jsonify({'error': f"Unknown weeks: {', '.join(unknown_weeks)}"}), 404
+    
+    first = request_dataset(weeks[0] if weeks else None)
+    fields = [field.strip() for field in args.get('fields', '').split(',') if field.strip()]
+    unknown = [field for field in fields if not first.has_column(field)]
+    if first and unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    fields = fields or (list(first[0]) if first else [])
+    filters = table_filters(args)
+    
+    def sections():
+        # Weeks are fetched one at a time as the export reaches them
+        for i, week in enumerate(weeks or [None]):
+            data = first if i == 0 else get_weekly_player_stats(week)
+            _, rows = query_players(data, order=table_order(args, data), **filters)
+            yield ({'Week': week} if week else {}), rows
+    
+    compress = bool(request.accept_encodings['gzip'])
+    mimetype, extension = FORMATS[export_format]
+    response = app.response_class(iter_export(sections(), fields, export_format, compress), mimetype=mimetype)
+    if len(weeks) == 1:
+        filename = weeks[0].lower().replace(' ', '_') + '_stats'  # e.g. week_3_stats, as in weekly_data/
+    else:
+        filename = 'weekly_player_stats' if weeks else 'player_stats'
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.route('/api/players/<player_ids>/history')
+def player_history_api(player_ids):
+    """
+    API endpoint returning players' week-by-week points and stats.
+    Takes one ID or several separated by commas, e.g. /api/players/1001,1002/history.
+    """
+    player_ids = [player_id.strip() for player_id in player_ids.split(',') if player_id.strip()]
+    with phase('compute'):
+        version, players = get_player_history(player_ids)
+    if not players:
+        return jsonify({'error': 'No weekly data found for the requested players'}), 404
+    
+    use_dataset_version(version)
+    with phase('render'):
+        return jsonify({'players': players})
 
 @app.route('/compare')
 def compare_page():
     """Render the player comparison page."""
-    week = request.args.get('week')
-    data = get_weekly_player_stats(week) if week else get_player_stats()
-    available_weeks = get_available_weeks()
-    ga_id = os.environ.get('GA_MEASUREMENT_ID', '')
-    return render_template('compare.html', data=data, available_weeks=available_weeks,
-                         selected_week=week, ga_measurement_id=ga_id)
+    return render_data_page('compare.html')
 
 @app.route('/api/compare')
 def compare_api():
@@ -39,25 +353,116 @@ def compare_api():
     if len(player_ids) < 1:
         return jsonify({'error': 'At least 1 player required for comparison'}), 400
     
-    if week:
-        comparison_data = compare_players_weekly(player_ids, week)
-    else:
-        comparison_data = compare_players(player_ids)
+    data = request_dataset(week)
+    if data.version:
+        use_dataset_version(data.version, data.modified)
+    with phase('compute'):
+        if week:
+            comparison_data = compare_players_weekly(player_ids, week, data)
+        else:
+            comparison_data = compare_players(player_ids, data)
+    
+    with phase('render'):
+        return jsonify(comparison_data)
+
+# Upper bound on groups x weeks in one batch comparison
+MAX_BATCH_COMPARISONS = 500
+
+@app.route('/api/compare/batch', methods=['POST'])
+def compare_batch_api():
+    """
+    API endpoint comparing many groups of players across weeks in one call.
+    Expects JSON {"groups": [[id, ...], ...], "weeks": [null, "Week 4", ...]}, where null
+    (the default) stands for the season totals, and returns {"results": [...]} with one
+    entry per week and group, weeks outermost.
+    """
+    payload = request.get_json(silent=True)
+    if payload is None:
+        payload = {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object with groups and weeks'}), 400
+    groups = payload.get('groups')
+    weeks = payload.get('weeks') or [None]
     
-    return jsonify(comparison_data)
+    if not isinstance(groups, list) or not groups or not all(isinstance(group, list) and group for group in groups):
+        return jsonify({'error': 'groups must be a non-empty list of player ID lists'}), 400
+    if not isinstance(weeks, list) or not all(week is None or isinstance(week, str) for week in weeks):
+        return jsonify({'error': 'weeks must be a list of week names or null'}), 400
+    if len(groups) * len(weeks) > MAX_BATCH_COMPARISONS:
+        return jsonify({'error': f'At most {MAX_BATCH_COMPARISONS} comparisons per request'}), 400
+    
+    with phase('compute'):
+        results = compare_player_groups(groups, weeks)
+    with phase('render'):
+        return jsonify({'results': results})
+
+@app.route('/metrics')
+def metrics_api():
+    """Request, cache and dataset metrics of this worker in the Prometheus text format."""
+    return app.response_class(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+def debug_authorized():
+    token = app.config.get('DEBUG_TOKEN')
+    given = request.headers.get('X-Debug-Token', '')
+    return bool(token) and hmac.compare_digest(given.encode('utf-8'), str(token).encode('utf-8'))
+
+def memory_caches():
+    """Caches measured by the memory report besides the datasets."""
+    return {'render_cache': render_cache, 'comparison_cache': comparison_cache}
+
+@app.route('/debug/memory')
+def debug_memory():
+    """Deep memory sizes of this worker's datasets, indexes and caches, plus its RSS."""
+    if not debug_authorized():
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify(memory_report(store, memory_caches()))
+
+@app.route('/debug/memory/snapshots', methods=['POST', 'DELETE'])
+def debug_memory_snapshots():
+    """
+    POST takes a tracemalloc snapshot of this worker (tracing starts with the first one, with
+    ?frames=N frames per allocation) and returns its id and largest allocation sites;
+    DELETE drops the snapshots and stops tracing.
+    """
+    if not debug_authorized():
+        return jsonify({'error': 'Not found'}), 404
+    if request.method == 'DELETE':
+        tracer.stop()
+        return jsonify({'snapshots': []})
+    frames = min(max(request.args.get('frames', 1, type=int), 1), 25)
+    return jsonify(tracer.snapshot(frames, limit=request.args.get('limit', 20, type=int)))
+
+@app.route('/debug/memory/snapshots/<int:first>/diff/<int:second>')
+def debug_memory_diff(first, second):
+    """Allocation sites that grew or shrank most between two snapshots of this worker."""
+    if not debug_authorized():
+        return jsonify({'error': 'Not found'}), 404
+    try:
+        return jsonify(tracer.diff(first, second, limit=request.args.get('limit', 20, type=int)))
+    except KeyError:
+        return jsonify({'error': 'Unknown snapshot', 'snapshots': tracer.snapshots()}), 404
 
 @app.route('/draft')
 def mock_draft():
     """Render the mock draft page."""
-    week = request.args.get('week')
-    data = get_weekly_player_stats(week) if week else get_player_stats()
-    available_weeks = get_available_weeks()
-    ga_id = os.environ.get('GA_MEASUREMENT_ID', '')
-    return render_template('draft.html', data=data, available_weeks=available_weeks,
-                         selected_week=week, ga_measurement_id=ga_id)
+    return render_data_page('draft.html')
 
 @app.after_request
 def add_header(response):
+    version = g.get('dataset_version')
+    if version and response.status_code == 200:
+        # Versioned content: cacheable until the dataset changes, with 304s for revalidation
+        max_age, stale = app.config['CACHE_POLICIES'].get(request.endpoint, (0, 0))
+        response.headers['Cache-Control'] = f'public, max-age={max_age}, stale-while-revalidate={stale}'
+        # Responses also list the available weeks, so adding or rewriting a weekly file
+        # changes the validators as well
+        weeks = weekly_signature()
+        response.set_etag(hashlib.sha1(repr((version, weeks)).encode('utf-8')).hexdigest()[:16])
+        modified = [g.dataset_modified] + [signature[0][0] / 1e9 for _, signature in weeks if signature[0]]
+        modified = [timestamp for timestamp in modified if timestamp is not None]
+        if modified:
+            response.last_modified = max(modified)
+        return response.make_conditional(request)
     if 'Cache-Control' not in response.headers:
         if 'static' in request.path:
             # Cache static assets for 1 week
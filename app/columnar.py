@@ -0,0 +1,208 @@
+"""
+Typed columnar file format for player_stats.bin.
+
+combine.py writes the season table here alongside player_stats.csv so the app can
+memory-map it at startup instead of parsing the CSV. Layout (little-endian):
+
+    magic    8 bytes   b'MLSCOL1\\0'
+    length   uint32    size of the JSON header
+    header   JSON      {"rows": N, "columns": [{"name", "type", "offset"}], "strings": {...}}
+    data     8-byte aligned sections; header offsets are relative to the start of the data
+
+Numeric columns are N int64 or float64 values read straight from the map with no copy.
+String columns are N int32 indexes into one shared, de-duplicated string table stored as
+int64 offsets plus a UTF-8 blob. Values are handed out as the same strings the CSV holds,
+so a missing value (None) is stored as '' just as csv.DictWriter writes it.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+from records import display_number
+
+MAGIC = b'MLSCOL1\0'
+TYPE_CODES = {'int64': 'q', 'float64': 'd', 'str': 'i'}
+
+def _column_type(values):
+    """Pick the narrowest type that round-trips every value as the CSV writer would print it."""
+    if all(type(value) is int for value in values):
+        return 'int64'
+    if all(type(value) is float for value in values):
+        return 'float64'
+    return 'str'
+
+def _align(size):
+    return (size + 7) & ~7
+
+def _to_bytes(values, type_code):
+    data = array(type_code, values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+def write_table(path, rows):
+    """Write a list of same-keyed dicts (e.g. the rows of player_stats.csv) as a columnar file."""
+    names = list(rows[0].keys()) if rows else []
+    strings = {}
+    sections = []
+    columns = []
+    for name in names:
+        values = [row[name] for row in rows]
+        column_type = _column_type(values)
+        if column_type == 'str':
+            values = [strings.setdefault('' if value is None else str(value), len(strings)) for value in values]
+        columns.append({'name': name, 'type': column_type})
+        sections.append(_to_bytes(values, TYPE_CODES[column_type]))
+
+    # Shared string table: offsets into one UTF-8 blob
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    sections.append(_to_bytes(offsets, 'q'))
+    sections.append(b''.join(encoded))
+
+    # Section offsets are relative to the (8-byte aligned) start of the data
+    offset = 0
+    for column, section in zip(columns, sections):
+        column['offset'] = offset
+        offset = _align(offset + len(section))
+    string_offsets = offset
+    offset = _align(offset + len(sections[-2]))
+    header = {
+        'rows': len(rows),
+        'columns': columns,
+        'strings': {'count': len(encoded), 'offsets': string_offsets, 'blob': offset, 'blob_size': len(sections[-1])},
+    }
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    preamble = MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(preamble.ljust(_align(len(preamble)), b'\0'))
+        for section in sections:
+            f.write(section.ljust(_align(len(section)), b'\0'))
+    os.replace(tmp_path, path)
+
+class StringColumn:
+    """Sequence view of a string column, decoding each distinct string once on first use."""
+    __slots__ = ('_indexes', '_table')
+
+    def __init__(self, indexes, table):
+        self._indexes = indexes
+        self._table = table
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __getitem__(self, row):
+        return self._table.string(self._indexes[row])
+
+class TableRow(Mapping):
+    """Read-only dict-like view of one row; values are formatted as the CSV holds them."""
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, name):
+        return self._table.value(name, self._row)
+
+    def number(self, name):
+        """Return a cell as a number (see ColumnTable.number); 0 for a missing column."""
+        return self._table.number(name, self._row) if name in self._table.columns else 0
+
+    def __contains__(self, name):
+        return name in self._table.columns
+
+    def __iter__(self):
+        return iter(self._table.columns)
+
+    def __len__(self):
+        return len(self._table.columns)
+
+    def __repr__(self):
+        return f"TableRow({dict(self)!r})"
+
+class ColumnTable:
+    """A memory-mapped columnar file opened with open_table."""
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise RuntimeError("columnar files are only readable on little-endian machines")
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a columnar table")
+
+        view = memoryview(self._map)
+        header_size, = struct.unpack_from('<I', self._map, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(bytes(view[start:start + header_size]))
+        self.num_rows = header['rows']
+        view = view[_align(start + header_size):]
+
+        strings = header['strings']
+        self._string_offsets = self._slice(view, strings['offsets'], 'q', strings['count'] + 1)
+        self._string_blob = view[strings['blob']:strings['blob'] + strings['blob_size']]
+        self._strings = [None] * strings['count']
+
+        self.columns = {}
+        self._formatters = {}
+        self._numbers = {}
+        for column in header['columns']:
+            values = self._slice(view, column['offset'], TYPE_CODES[column['type']], self.num_rows)
+            if column['type'] == 'str':
+                self.columns[column['name']] = StringColumn(values, self)
+                self._formatters[column['name']] = None
+            else:
+                self.columns[column['name']] = values
+                self._formatters[column['name']] = str if column['type'] == 'int64' else repr
+
+    @staticmethod
+    def _slice(view, offset, type_code, count):
+        size = struct.calcsize(type_code)
+        return view[offset:offset + size * count].cast(type_code)
+
+    def string(self, index):
+        value = self._strings[index]
+        if value is None:
+            start, end = self._string_offsets[index], self._string_offsets[index + 1]
+            value = self._strings[index] = str(self._string_blob[start:end], 'utf-8')
+        return value
+
+    def column(self, name):
+        """Return a column as a zero-copy memoryview (numeric) or a StringColumn."""
+        return self.columns[name]
+
+    def value(self, name, row):
+        """Return one cell formatted as the CSV would hold it."""
+        formatter = self._formatters[name]
+        value = self.columns[name][row]
+        return value if formatter is None else formatter(value)
+
+    def number(self, name, row):
+        """
+        Return one cell as a number: numeric columns as stored, string columns such as
+        '$5.5M' or '12.34%' parsed with records.display_number once per column.
+        """
+        if self._formatters[name] is not None:
+            return self.columns[name][row]
+        numbers = self._numbers.get(name)
+        if numbers is None:
+            column = self.columns[name]
+            numbers = self._numbers[name] = [display_number(column[i]) for i in range(self.num_rows)]
+        return numbers[row]
+
+    def rows(self):
+        """Return a TableRow view for every row."""
+        return [TableRow(self, row) for row in range(self.num_rows)]
+
+def open_table(path):
+    """Memory-map a columnar file written by write_table."""
+    return ColumnTable(path)
@@ -1,78 +1,612 @@
 import csv
 import os
 import glob
-from functools import lru_cache
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from scoring_rules import decode_actual_counts
+from columnar import open_table
+from records import RecordTable
+from weekly_table import read_week_table
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Position filter values used by the table page, mapped to the names in the data
+POSITION_CODES = {'GK': 'Goalkeeper', 'DEF': 'Defender', 'MID': 'Midfielder', 'FWD': 'Forward'}
+# Columns matched by the table's text search
+SEARCH_COLUMNS = ('Player ID', 'Name', 'Team', 'Positions')
+# Seconds between checks for changed data files; 0 disables reloading
+RELOAD_INTERVAL = float(os.environ.get('DATA_RELOAD_INTERVAL', 5))
+# Memory the week store may use before evicting the least recently used weeks
+WEEK_MEMORY_BUDGET = int(float(os.environ.get('WEEK_MEMORY_BUDGET_MB', 64)) * 2**20)
+WEEK_LOAD_WORKERS = 8
+# Weekly stat columns served by the per-player history, parsed to numbers
+HISTORY_COLUMNS = (
+    'Games Played', 'Total Points', 'Average Points', 'Goals', 'Assists', 'Minutes',
+    'Yellow Cards', 'Red Cards', 'Clean Sheets', 'Goals Conceded', 'Shots on Goal', 'Key Passes'
+)
+# Directory holding player_stats.csv/.bin and weekly_data/ (e.g. a synthetic dataset for benchmarks)
+DATA_DIR = os.environ.get('DATA_DIR', os.path.dirname(__file__))
+WEEKLY_DATA_DIR = os.path.join(DATA_DIR, 'weekly_data')
+
+# Season stats compared on /compare, with display names, and those where lower is better
+COMPARISON_STATS = (
+    'Cost', 'Total Points', 'Average Points', 'Owned By',
+    'Total Combined Points', 'Total GL Points', 'Total ASS Points',
+    'Total YC Points', 'Total RC Points', 'Total CS Points',
+    'Total MIN Points', 'Total KP Points', 'Total CRS Points'
+)
+STAT_DISPLAY_NAMES = {
+    'Cost': 'Cost',
+    'Total Points': 'Total Points',
+    'Average Points': 'Average Points',
+    'Owned By': 'Owned By',
+    'Total Combined Points': 'Combined Points',
+    'Total GL Points': 'Goals',
+    'Total ASS Points': 'Assists',
+    'Total YC Points': 'Yellow Cards',
+    'Total RC Points': 'Red Cards',
+    'Total CS Points': 'Clean Sheets',
+    'Total MIN Points': 'Minutes Played',
+    'Total KP Points': 'Key Passes',
+    'Total CRS Points': 'Crosses'
+}
+NEGATIVE_STATS = frozenset(('Total YC Points', 'Total RC Points', 'Cost'))
+# Weekly comparison stats (adjusted for weekly data)
+WEEKLY_COMPARISON_STATS = (
+    'Cost', 'Games Played', 'Total Points', 'Average Points',
+    'Goals', 'Assists', 'Minutes', 'Yellow Cards', 'Red Cards',
+    'Clean Sheets', 'Goals Conceded', 'Shots on Goal', 'Key Passes'
+)
+WEEKLY_NEGATIVE_STATS = frozenset(('Yellow Cards', 'Red Cards', 'Cost', 'Goals Conceded'))
+COMPARISON_CACHE_SIZE = 4096
+# Serialized payloads kept per dataset (distinct field projections)
+SERIALIZED_CACHE_SIZE = 32
+
+def sort_key(value):
+    """
+    Sort key for a displayed value: numbers (including '$5.0M' and '12.34%') sort
+    numerically ahead of text, which sorts case-insensitively.
+    """
+    text = str(value if value is not None else '').strip()
+    try:
+        return (0, float(text.replace('$', '').replace('M', '').replace('%', '')), '')
+    except ValueError:
+        return (1, 0.0, text.casefold())
+
+class PlayerDataset(list):
+    """
+    A loaded list of player rows that also carries a Player ID -> row index.
+    The index is built once when the dataset is loaded, so every reload rebuilds it.
+    Per-column sort orders for the server-side table are computed on first use and
+    kept with the dataset, so a request only has to filter and slice.
+    source is the file the rows were loaded from: version is a content hash of it and
+    modified its modification time, both empty for a dataset without a file.
+    nbytes estimates the memory held by the rows (storage_nbytes for whatever backs
+    them) and the ID index.
+    """
+    def __init__(self, rows=(), source=None, storage_nbytes=0):
+        super().__init__(rows)
+        self.version = file_version(source) if source else ''
+        self.modified = os.path.getmtime(source) if source else None
+        self.by_id = {}
+        for row in self:
+            # Keep the first row for a duplicated ID, as a linear scan would
+            self.by_id.setdefault(row.get('Player ID'), row)
+        self.nbytes = (storage_nbytes + sys.getsizeof(self) + sys.getsizeof(self.by_id)
+                       + sum(sys.getsizeof(row) for row in self))
+        self._sort_keys = {}
+        self._sort_orders = {}
+        self._sort_ranks = {}
+        self._search_text = None
+        self._stat_vectors = {}
+        self._serialized = {}
+    
+    def get_player(self, player_id):
+        """Return the row for a player ID, or None if it is not in this dataset."""
+        return self.by_id.get(str(player_id))
+    
+    def has_column(self, column):
+        return bool(self) and column in self[0]
+    
+    def sort_keys(self, column):
+        """Return the sort_key of every row's value in a column."""
+        keys = self._sort_keys.get(column)
+        if keys is None:
+            keys = self._sort_keys[column] = [sort_key(row.get(column)) for row in self]
+        return keys
+    
+    def sort_order(self, column, descending=False):
+        """Return the row positions sorted by a column; ties keep dataset order either way."""
+        order = self._sort_orders.get((column, descending))
+        if order is None:
+            ranks = self.sort_ranks(column)
+            sign = -1 if descending else 1
+            order = self._sort_orders[(column, descending)] = sorted(range(len(self)), key=lambda i: sign * ranks[i])
+        return order
+    
+    def sort_ranks(self, column):
+        """Return each row's rank in ascending column order, equal values sharing a rank."""
+        ranks = self._sort_ranks.get(column)
+        if ranks is None:
+            keys = self.sort_keys(column)
+            ranks = [0] * len(self)
+            rank, previous = -1, None
+            for i in sorted(range(len(self)), key=keys.__getitem__):
+                if keys[i] != previous:
+                    rank, previous = rank + 1, keys[i]
+                ranks[i] = rank
+            self._sort_ranks[column] = ranks
+        return ranks
+    
+    def to_json(self, fields=None, compact=False):
+        """
+        Return the rows as JSON text, projected to fields (default: every column) and
+        optionally compact (see project_rows). Each projection is serialized once and
+        kept with the dataset, so once per dataset version.
+        """
+        fields = tuple(fields) if fields else tuple(self[0]) if self else ()
+        key = (fields, compact)
+        text = self._serialized.get(key)
+        if text is None:
+            serialized_counts['misses'] += 1
+            text = dumps_json(project_rows(self, fields, compact))
+            if len(self._serialized) >= SERIALIZED_CACHE_SIZE:
+                self._serialized.clear()
+            self._serialized[key] = text
+        else:
+            serialized_counts['hits'] += 1
+        return text
+    
+    def stat_vectors(self, stats):
+        """Return {Player ID: tuple of row.number(stat) for stats}, computed once per stats tuple."""
+        vectors = self._stat_vectors.get(stats)
+        if vectors is None:
+            vectors = self._stat_vectors[stats] = {
+                player_id: tuple(row.number(stat) for stat in stats) for player_id, row in self.by_id.items()
+            }
+        return vectors
+    
+    def build_indexes(self):
+        """Compute the search text and every column's sort ranks now rather than on first use."""
+        self.search_text()
+        self.stat_vectors(COMPARISON_STATS)
+        self.stat_vectors(WEEKLY_COMPARISON_STATS)
+        for column in (self[0] if self else ()):
+            self.sort_ranks(column)
+            self.sort_order(column)
+            self.sort_order(column, descending=True)
+        return self
+    
+    def search_text(self):
+        """Return the lower-cased searchable text of every row."""
+        if self._search_text is None:
+            self._search_text = [
+                ' '.join(str(row.get(column, '')) for column in SEARCH_COLUMNS).casefold() for row in self
+            ]
+        return self._search_text
+
+def parse_number(value):
+    """Parse a CSV value as an int or float, treating blanks and text as 0."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0
+
+def week_number(week):
+    """'Week 14' -> 14"""
+    return int(week.split()[-1])
+
+class PlayerHistory:
+    """
+    Long-format weekly stats: one record per (player, week), ordered by player and then
+    week, so each player's records are contiguous and a lookup is a single slice.
+    Records are (week, HISTORY_COLUMNS values...) tuples of numbers.
+    """
+    columns = ('Week',) + HISTORY_COLUMNS
+
+    def __init__(self, weeks, version=''):
+        """weeks is a sequence of (week name, weekly PlayerDataset)."""
+        self.version = version
+        by_player = {}
+        names = {}
+        for week, data in sorted(weeks, key=lambda item: week_number(item[0])):
+            for row in data:
+                player_id = row.get('Player ID')
+                names.setdefault(player_id, row.get('Name'))
+                by_player.setdefault(player_id, []).append(
+                    (week,) + tuple(parse_number(row.get(column)) for column in HISTORY_COLUMNS)
+                )
+        
+        self._records = []
+        self._players = {}  # player ID -> (name, start, end)
+        for player_id, records in by_player.items():
+            start = len(self._records)
+            self._records.extend(records)
+            self._players[player_id] = (names[player_id], start, len(self._records))
+    
+    def __contains__(self, player_id):
+        return str(player_id) in self._players
+    
+    def records(self, player_id):
+        """Return a player's (week, stats...) records in week order; empty if unknown."""
+        entry = self._players.get(str(player_id))
+        if entry is None:
+            return []
+        return self._records[entry[1]:entry[2]]
+    
+    def player(self, player_id):
+        """Return {'name', 'weeks': [{column: value}]} for a player, or None if unknown."""
+        entry = self._players.get(str(player_id))
+        if entry is None:
+            return None
+        return {
+            'name': entry[0],
+            'weeks': [dict(zip(self.columns, record)) for record in self.records(player_id)],
+        }
+
+def dumps_json(obj):
+    """Serialize to compact JSON text, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'))
+
+def project_rows(rows, fields, compact=False):
+    """
+    Return rows restricted to fields (in that order) as dicts, or with compact=True as
+    {'columns': fields, 'rows': [[value, ...], ...]} so keys are not repeated per row.
+    """
+    if compact:
+        return {'columns': list(fields), 'rows': [[row.get(field) for field in fields] for row in rows]}
+    return [{field: row.get(field) for field in fields} for row in rows]
+
+def file_version(path):
+    """Return a short content hash of a data file."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def query_players(data, start=0, length=-1, order=(), search='', position='', team='',
+                  min_price=None, max_price=None, minimums=()):
+    """
+    Filter, sort and page a PlayerDataset for the server-side table.
+    order is a sequence of (column, descending) pairs and prices are in dollars, as the
+    price filters on the table page send them. minimums is a sequence of (columns, value)
+    pairs keeping rows whose value in the first of the columns the dataset has is at least
+    value (season and weekly files name some stats differently). A negative length returns
+    every match. Returns (number of rows matching the filters, rows on the requested page).
+    """
+    position = POSITION_CODES.get(position, position)
+    minimums = [
+        (data.sort_keys(column), value)
+        for columns, value in minimums
+        for column in [next((column for column in columns if data.has_column(column)), None)]
+        if column
+    ]
+    selected = None  # None means every row
+    if search or position or team or min_price is not None or max_price is not None or minimums:
+        terms = search.casefold().split()
+        search_text = data.search_text()
+        costs = data.sort_keys('Cost')
+        selected = []
+        for i, row in enumerate(data):
+            if terms and not all(term in search_text[i] for term in terms):
+                continue
+            if position and position not in row.get('Positions', '').split(', '):
+                continue
+            if team and row.get('Team') != team:
+                continue
+            # Costs are displayed in millions
+            if min_price is not None and not (costs[i][0] == 0 and costs[i][1] * 1e6 >= min_price):
+                continue
+            if max_price is not None and not (costs[i][0] == 0 and costs[i][1] * 1e6 <= max_price):
+                continue
+            if not all(keys[i][0] == 0 and keys[i][1] >= value for keys, value in minimums):
+                continue
+            selected.append(i)
+    
+    if not order:
+        rows = range(len(data)) if selected is None else selected
+    elif len(order) == 1:
+        rows = data.sort_order(*order[0])
+        if selected is not None:
+            keep = set(selected)
+            rows = [i for i in rows if i in keep]
+    else:
+        ranks = [(data.sort_ranks(column), -1 if descending else 1) for column, descending in order]
+        rows = sorted(range(len(data)) if selected is None else selected,
+                      key=lambda i: tuple(sign * column_ranks[i] for column_ranks, sign in ranks))
+    
+    page = rows[start:] if length < 0 else rows[start:start + length]
+    return len(rows), [data[i] for i in page]
+
+def season_paths():
+    """Return the (CSV, columnar) paths of the season data."""
+    # Use an absolute path to the CSV file in the Docker container
+    return os.path.join(DATA_DIR, 'player_stats.csv'), os.path.join(DATA_DIR, 'player_stats.bin')
+
+def weekly_path(week):
+    """Return the path of a week's CSV file (e.g. 'Week 14' -> weekly_data/week_14_stats.csv)."""
+    week_filename = f"{week.lower().replace(' ', '_')}_stats.csv"
+    return os.path.join(WEEKLY_DATA_DIR, week_filename)
+
+def file_signature(*paths):
+    """Return the (mtime, size) of each path, or None for missing ones; a cheap change check."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+class DataStore:
+    """
+    Holds the loaded season and weekly datasets and replaces them when their files change.
+
+    A watcher thread checks the files' signatures every RELOAD_INTERVAL seconds. A changed
+    file is reloaded (with its indexes) in that thread once its signature has been stable
+    for one interval, so a half-written file is not picked up, and the new dataset is then
+    swapped in with a single assignment. Requests holding the old dataset keep a
+    consistent snapshot of it.
+
+    Weeks are kept until their estimated size (PlayerDataset.nbytes) adds up to more than
+    week_budget bytes; the least recently used weeks are then evicted and reloaded if
+    they are asked for again.
+    """
+
+    def __init__(self, interval=RELOAD_INTERVAL, week_budget=WEEK_MEMORY_BUDGET):
+        self.interval = interval
+        self.week_budget = week_budget
+        self.week_nbytes = 0
+        # Requests served from a loaded week, weeks loaded on demand, evictions and reloads
+        self.week_hits = 0
+        self.week_loads = 0
+        self.week_evictions = 0
+        self.reloads = 0
+        self._season = None  # (signature, dataset)
+        self._weeks = OrderedDict()  # week -> (signature, dataset), least recently used first
+        self._history = None  # (week file signatures, PlayerHistory)
+        self._pending = {}  # key -> signature seen on the last check but not loaded yet
+        self._lock = threading.Lock()
+        self._watcher_pid = None
+
+    def season(self):
+        """Return the current season dataset, loading it on first use."""
+        self._ensure_watcher()
+        return self._season_dataset()
+
+    def week(self, week):
+        """Return the current dataset for a week, loading it on first use."""
+        self._ensure_watcher()
+        return self._week_dataset(week)
+
+    def history(self):
+        """
+        Return the PlayerHistory over every available week, rebuilt only when a weekly file
+        is added, removed or changed.
+        """
+        self._ensure_watcher()
+        return self._history_index()
+
+    def _history_index(self):
+        # Keyed on the weekly files' signatures, so checking an unchanged index costs one
+        # stat per week and loads nothing
+        key = weekly_signature()
+        entry = self._history
+        if entry is None or entry[0] != key:
+            version = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+            weeks = [(week, self._history_week(week, signature)) for week, signature in key]
+            entry = self._history = (key, PlayerHistory(weeks, version))
+        return entry[1]
+
+    def _history_week(self, week, signature):
+        """
+        Return a week's data for rebuilding the history: the loaded dataset if it is current,
+        otherwise read from its file without entering the week store (or its LRU order).
+        """
+        entry = self._weeks.get(week)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        return load_weekly_player_stats(week)
+
+    def preload(self, weeks=()):
+        """
+        Load the season and the given weeks (in parallel) with their indexes built. Meant for
+        a server that forks workers afterwards, so it does not start the watcher in this process.
+        """
+        self._season_dataset().build_indexes()
+        weeks = [week for week in weeks if week not in self._weeks]
+        with ThreadPoolExecutor(max_workers=WEEK_LOAD_WORKERS) as executor:
+            loaded = executor.map(lambda week: (week, self._load_week(week)), weeks)
+            for week, entry in loaded:
+                entry[1].build_indexes()
+                with self._lock:
+                    self._store_week(week, entry)
+        self._history_index()
+
+    def loaded(self):
+        """Return the datasets in memory as {'season' or week: dataset}, without loading any."""
+        datasets = {'season': self._season[1]} if self._season is not None else {}
+        datasets.update((week, entry[1]) for week, entry in list(self._weeks.items()))
+        return datasets
+
+    def loaded_history(self):
+        """Return the PlayerHistory if it has been built, without building it."""
+        return self._history[1] if self._history is not None else None
+
+    def refresh(self):
+        """Reload every loaded dataset whose files changed and have since been stable."""
+        if self._season is not None:
+            signature = file_signature(*season_paths())
+            if self._is_settled('season', self._season[0], signature):
+                self._season = (signature, load_player_stats().build_indexes())
+                self.reloads += 1
+        for week, entry in list(self._weeks.items()):
+            signature = file_signature(weekly_path(week))
+            if self._is_settled(week, entry[0], signature):
+                entry = (signature, load_weekly_player_stats(week).build_indexes())
+                with self._lock:
+                    if week in self._weeks:
+                        self._store_week(week, entry)
+                        self.reloads += 1
+
+    def _season_dataset(self):
+        entry = self._season
+        if entry is None:
+            with self._lock:
+                if self._season is None:
+                    self._season = (file_signature(*season_paths()), load_player_stats())
+                entry = self._season
+        return entry[1]
+
+    def _week_dataset(self, week):
+        entry = self._weeks.get(week)
+        if entry is None:
+            entry = self._load_week(week)
+            # Weeks without a file are not kept, so unknown ?week= values cannot fill the store
+            if entry[1].version:
+                with self._lock:
+                    self._store_week(week, entry)
+                    self.week_loads += 1
+        else:
+            with self._lock:
+                self.week_hits += 1
+                if week in self._weeks:
+                    self._weeks.move_to_end(week)
+        return entry[1]
+
+    @staticmethod
+    def _load_week(week):
+        return (file_signature(weekly_path(week)), load_weekly_player_stats(week))
+
+    def _store_week(self, week, entry):
+        """Add or replace a week (holding the lock), then evict down to the budget."""
+        previous = self._weeks.pop(week, None)
+        if previous is not None:
+            self.week_nbytes -= previous[1].nbytes
+        self._weeks[week] = entry
+        self.week_nbytes += entry[1].nbytes
+        # Always keep the week just stored
+        while self.week_nbytes > self.week_budget and len(self._weeks) > 1:
+            evicted_week, evicted = self._weeks.popitem(last=False)
+            self.week_nbytes -= evicted[1].nbytes
+            self.week_evictions += 1
+            print(f"Week store over budget, evicted {evicted_week}")
+
+    def _is_settled(self, key, loaded, signature):
+        """True when a file differs from what was loaded and is unchanged since the last check."""
+        if signature == loaded:
+            self._pending.pop(key, None)
+            return False
+        settled = self._pending.get(key) == signature
+        self._pending[key] = signature
+        if settled:
+            del self._pending[key]
+        return settled
+
+    def _ensure_watcher(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self.interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid != os.getpid():
+                self._watcher_pid = os.getpid()
+                threading.Thread(target=self._watch, name='data-reload', daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Data reload failed: {e}")
+
+store = DataStore()
+
+class LRUCache:
+    """A small thread-safe least-recently-used cache."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def __len__(self):
+        return len(self._items)
+
+comparison_cache = LRUCache(COMPARISON_CACHE_SIZE)
+# Lookups of PlayerDataset.to_json answered from / missing its per-dataset memo
+serialized_counts = {'hits': 0, 'misses': 0}
 
-@lru_cache(maxsize=1)
 def get_player_stats():
+    """Return the current season player statistics from the data store."""
+    return store.season()
+
+def load_player_stats():
     """
-    Load player statistics from CSV file.
-    Using lru_cache to avoid repeated disk reads for the same data.
+    Load player statistics, preferring the memory-mapped columnar copy over the CSV file.
     """
     data = []
-    # Use an absolute path to the CSV file in the Docker container
-    csv_file_path = os.path.join(os.path.dirname(__file__), 'player_stats.csv')
+    csv_file_path, table_path = season_paths()
+    
+    # Rows are read-only views over the mapped columns; no parsing needed
+    if os.path.exists(table_path) and (
+            not os.path.exists(csv_file_path) or os.path.getmtime(table_path) >= os.path.getmtime(csv_file_path)):
+        try:
+            return PlayerDataset(open_table(table_path).rows(), table_path)
+        except (OSError, ValueError) as e:
+            print(f"Could not open {table_path}, falling back to CSV: {e}")
     
     try:
         with open(csv_file_path, newline='', encoding='utf-8') as csvfile:
             reader = csv.DictReader(csvfile)
             for row in reader:
-                # Calculate actual goals and assists from fantasy points for season data
-                positions = row.get('Positions', '').lower()
-                is_defender_or_goalkeeper = 'defender' in positions or 'goalkeeper' in positions
-                
-                # Calculate actual goals from Total GL Points
-                gl_points = int(row.get('Total GL Points', 0)) if row.get('Total GL Points', 0) != '' else 0
-                if gl_points > 0:
-                    if is_defender_or_goalkeeper:
-                        actual_goals = gl_points // 6  # 6 points per goal for defenders/goalkeepers
-                    else:
-                        actual_goals = gl_points // 5  # 5 points per goal for forwards/midfielders
-                else:
-                    actual_goals = 0
-                row['Actual Goals'] = str(actual_goals)
-                
-                # Calculate actual assists from Total ASS Points (3 points per assist)
-                ass_points = int(row.get('Total ASS Points', 0)) if row.get('Total ASS Points', 0) != '' else 0
-                actual_assists = ass_points // 3 if ass_points > 0 else 0
-                row['Actual Assists'] = str(actual_assists)
-                
-                # Calculate actual stats from other fantasy points
-                # Yellow Cards: -1 point each
-                yc_points = int(row.get('Total YC Points', 0)) if row.get('Total YC Points', 0) != '' else 0
-                actual_yc = abs(yc_points) if yc_points < 0 else 0
-                row['Actual YC'] = str(actual_yc)
-                
-                # Red Cards: -3 points each
-                rc_points = int(row.get('Total RC Points', 0)) if row.get('Total RC Points', 0) != '' else 0
-                actual_rc = abs(rc_points) // 3 if rc_points < 0 else 0
-                row['Actual RC'] = str(actual_rc)
-                
-                # Clean Sheets: +5 points each (defenders/goalkeepers), +1 point (midfielders)
-                cs_points = int(row.get('Total CS Points', 0)) if row.get('Total CS Points', 0) != '' else 0
-                if cs_points > 0:
-                    if is_defender_or_goalkeeper:
-                        actual_cs = cs_points // 5
-                    else:
-                        actual_cs = cs_points  # Midfielders get 1 point per clean sheet
-                else:
-                    actual_cs = 0
-                row['Actual CS'] = str(actual_cs)
-                
-                # Minutes: Display actual minutes (no calculation needed, already stored as points)
-                min_points = row.get('Total MIN Points', '0')
-                row['Actual Minutes'] = min_points  # Minutes are stored as actual minutes
-                
-                # Goals Conceded: For defenders/goalkeepers, -1 point per 2 goals conceded
-                gc_points = int(row.get('Total GC Points', 0)) if row.get('Total GC Points', 0) != '' else 0
-                actual_gc = abs(gc_points) * 2 if gc_points < 0 else 0
-                row['Actual GC'] = str(actual_gc)
+                # Actual counts are exported by combine.py; older CSVs only carry points
+                if 'Actual Goals' not in row:
+                    row.update(decode_actual_counts(row))
                 
                 data.append(row)
     except FileNotFoundError:
         print(f"CSV file not found: {csv_file_path}")
+        return PlayerDataset(data)
     
-    return data
+    # Keep the rows typed rather than as dicts of strings
+    table = RecordTable.from_dicts(data)
+    return PlayerDataset(table.rows(), csv_file_path, table.nbytes)
 
 def get_position_options():
     """Get unique position options from the data."""
@@ -95,166 +629,76 @@ def get_team_options():
 
 def get_player_by_id(player_id):
     """Get a specific player by their ID."""
-    data = get_player_stats()
-    for player in data:
-        if player.get('Player ID') == str(player_id):
-            return player
-    return None
+    return get_player_stats().get_player(player_id)
 
-def compare_players(player_ids):
-    """Compare multiple players by their IDs."""
-    players = []
-    for player_id in player_ids:
-        player = get_player_by_id(player_id)
-        if player:
-            players.append(player)
+def compare_players(player_ids, data=None):
+    """Compare multiple players by their IDs, looked up in data (default: the season stats)."""
+    if data is None:
+        data = get_player_stats()
+    players = find_players(data, player_ids)
     
     if len(players) < 1:
         return {'error': 'No valid players found for comparison'}
     
-    # Define comparison stats with display names
-    comparison_stats = [
-        'Cost', 'Total Points', 'Average Points', 'Owned By',
-        'Total Combined Points', 'Total GL Points', 'Total ASS Points',
-        'Total YC Points', 'Total RC Points', 'Total CS Points',
-        'Total MIN Points', 'Total KP Points', 'Total CRS Points'
-    ]
-    
-    # Map abbreviated column names to display names
-    stat_display_names = {
-        'Cost': 'Cost',
-        'Total Points': 'Total Points',
-        'Average Points': 'Average Points',
-        'Owned By': 'Owned By',
-        'Total Combined Points': 'Combined Points',
-        'Total GL Points': 'Goals',
-        'Total ASS Points': 'Assists',
-        'Total YC Points': 'Yellow Cards',
-        'Total RC Points': 'Red Cards',
-        'Total CS Points': 'Clean Sheets',
-        'Total MIN Points': 'Minutes Played',
-        'Total KP Points': 'Key Passes',
-        'Total CRS Points': 'Crosses'
-    }
-    
-    comparison_data = {
+    return {
         'players': players,
-        'stats': comparison_stats,
-        'stat_display_names': stat_display_names,
-        'winner_stats': {}
+        'stats': COMPARISON_STATS,
+        'stat_display_names': STAT_DISPLAY_NAMES,
+        'winner_stats': stat_winners(data, players, COMPARISON_STATS, NEGATIVE_STATS),
     }
-    
-    # Determine winner for each stat (higher is better for most stats)
-    negative_stats = ['Total YC Points', 'Total RC Points', 'Cost']
-    
-    for stat in comparison_stats:
-        values = []
-        for player in players:
-            try:
-                # Clean up the value (remove $ and % signs, convert to float)
-                value_str = str(player.get(stat, '0'))
-                value_str = value_str.replace('$', '').replace('M', '').replace('%', '')
-                value = float(value_str) if value_str else 0
-                values.append((value, player['Player ID']))
-            except (ValueError, TypeError):
-                values.append((0, player['Player ID']))
-        
-        if stat in negative_stats:
-            # For negative stats, lower is better
-            winner_id = min(values, key=lambda x: x[0])[1]
-        else:
-            # For positive stats, higher is better
-            winner_id = max(values, key=lambda x: x[0])[1]
-        
-        comparison_data['winner_stats'][stat] = winner_id
-    
-    return comparison_data
 
-@lru_cache(maxsize=10)
 def get_weekly_player_stats(week=None):
     """
-    Load player statistics for a specific week from CSV files.
+    Return player statistics for a specific week from the data store.
     If week is None, returns the current season totals.
     """
     if week is None:
         return get_player_stats()
-    
-    # Construct the weekly CSV file path
-    week_filename = f"{week.lower().replace(' ', '_')}_stats.csv"
-    weekly_csv_path = os.path.join(os.path.dirname(__file__), 'weekly_data', week_filename)
+    return store.week(week)
+
+def load_weekly_player_stats(week):
+    """Load player statistics for a specific week from its CSV file into a compact WeekTable."""
+    weekly_csv_path = weekly_path(week)
     
     if not os.path.exists(weekly_csv_path):
         print(f"Weekly data not found: {weekly_csv_path}")
-        return []
+        return PlayerDataset()
     
-    data = []
     try:
-        with open(weekly_csv_path, newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                # Map weekly column names to match season data column names
-                mapped_row = {}
-                for key, value in row.items():
-                    mapped_row[key] = value
-                
-                # Add column mappings for main stats page compatibility
-                if 'Minutes' in row:
-                    mapped_row['Total MIN Points'] = row['Minutes']
-                if 'Goals' in row:
-                    mapped_row['Total GL Points'] = row['Goals']
-                    mapped_row['Actual Goals'] = row['Goals']  # For weekly data, goals are actual goals
-                if 'Assists' in row:
-                    mapped_row['Total ASS Points'] = row['Assists']
-                    mapped_row['Actual Assists'] = row['Assists']  # For weekly data, assists are actual assists
-                if 'Yellow Cards' in row:
-                    mapped_row['Total YC Points'] = row['Yellow Cards']
-                    mapped_row['Actual YC'] = row['Yellow Cards']
-                if 'Red Cards' in row:
-                    mapped_row['Total RC Points'] = row['Red Cards']
-                    mapped_row['Actual RC'] = row['Red Cards']
-                if 'Goals Conceded' in row:
-                    mapped_row['Total GC Points'] = row['Goals Conceded']
-                    mapped_row['Actual GC'] = row['Goals Conceded']
-                if 'Clean Sheets' in row:
-                    mapped_row['Total CS Points'] = row['Clean Sheets']
-                    mapped_row['Actual CS'] = row['Clean Sheets']
-                if 'Minutes' in row:
-                    mapped_row['Actual Minutes'] = row['Minutes']
-                if 'Shots on Goal' in row:
-                    mapped_row['Total SGS Points'] = row['Shots on Goal']
-                if 'Key Passes' in row:
-                    mapped_row['Total KP Points'] = row['Key Passes']
-                
-                # Add missing columns that season data has but weekly doesn't
-                mapped_row['Owned By'] = '0%'  # Not available in weekly data
-                mapped_row['High Score'] = row.get('Total Points', '0')
-                mapped_row['Low Score'] = '0'
-                mapped_row['Total Combined Points'] = row.get('Total Points', '0')
-                mapped_row['Total GS Points'] = '0'  # Goalkeeper saves
-                mapped_row['Total PS Points'] = '0'  # Penalty saves  
-                mapped_row['Total PM Points'] = '0'  # Penalty misses
-                mapped_row['Total OG Points'] = '0'  # Own goals
-                mapped_row['Total FS Points'] = '0'  # Fouls
-                mapped_row['Total PSS Points'] = '0' # Passes
-                mapped_row['Total CRS Points'] = '0' # Crosses
-                mapped_row['Total CL Points'] = '0'  # Clearances
-                mapped_row['Total WF Points'] = '0'  # Won fouls
-                
-                data.append(mapped_row)
+        table = read_week_table(weekly_csv_path)
     except FileNotFoundError:
         print(f"Weekly CSV file not found: {weekly_csv_path}")
+        return PlayerDataset()
     
-    return data
+    return PlayerDataset(table.rows(), weekly_csv_path, table.nbytes)
+
+def get_player_history(player_ids):
+    """
+    Return (history version, {player ID: {'name', 'weeks'}}) for the given IDs across every
+    available week, skipping IDs without weekly data.
+    """
+    history = store.history()
+    players = {}
+    for player_id in player_ids:
+        player = history.player(player_id)
+        if player is not None:
+            players[str(player_id)] = player
+    return history.version, players
+
+def weekly_signature():
+    """
+    Return ((week, file signature), ...) for every available week, which changes whenever
+    a weekly file is added, removed or rewritten.
+    """
+    return tuple((week, file_signature(weekly_path(week))) for week in get_available_weeks())
 
 def get_available_weeks():
     """Get list of available weeks from the weekly_data directory."""
-    weekly_data_dir = os.path.join(os.path.dirname(__file__), 'weekly_data')
-    
-    if not os.path.exists(weekly_data_dir):
+    if not os.path.exists(WEEKLY_DATA_DIR):
         return []
     
     # Find all weekly CSV files
-    csv_files = glob.glob(os.path.join(weekly_data_dir, 'week_*_stats.csv'))
+    csv_files = glob.glob(os.path.join(WEEKLY_DATA_DIR, 'week_*_stats.csv'))
     weeks = []
     
     for file_path in csv_files:
@@ -265,61 +709,85 @@ def get_available_weeks():
         weeks.append(week_name)
     
     # Sort weeks numerically
-    weeks.sort(key=lambda x: int(x.split()[-1]))
+    weeks.sort(key=week_number)
     return weeks
 
-def compare_players_weekly(player_ids, week=None):
-    """Compare multiple players by their IDs for a specific week."""
-    players = []
-    for player_id in player_ids:
-        player = get_player_by_id_weekly(player_id, week)
-        if player:
-            players.append(player)
+def compare_players_weekly(player_ids, week=None, data=None):
+    """Compare multiple players by their IDs for a specific week, looked up in data if given."""
+    if data is None:
+        data = get_weekly_player_stats(week)
+    players = find_players(data, player_ids)
     
     if len(players) < 1:
         return {'error': 'No valid players found for comparison'}
     
-    # Define comparison stats (adjusted for weekly data)
-    comparison_stats = [
-        'Cost', 'Games Played', 'Total Points', 'Average Points',
-        'Goals', 'Assists', 'Minutes', 'Yellow Cards', 'Red Cards',
-        'Clean Sheets', 'Goals Conceded', 'Shots on Goal', 'Key Passes'
-    ]
-    
-    comparison_data = {
+    return {
         'players': players,
-        'stats': comparison_stats,
-        'winner_stats': {},
+        'stats': WEEKLY_COMPARISON_STATS,
+        'winner_stats': stat_winners(data, players, WEEKLY_COMPARISON_STATS, WEEKLY_NEGATIVE_STATS),
         'week': week or 'Season Total'
     }
+
+def compare_player_groups(groups, weeks=(None,)):
+    """
+    Compare every group of player IDs in every week (None for the season totals).
+    Groups are compared as sets, in sorted ID order, so results can be cached on
+    (sorted IDs, week, dataset version) in comparison_cache.
+    Returns one {'players', 'week', 'stats', 'values', 'winner_stats'} (or {'error'})
+    per group and week, in order.
+    """
+    results = []
+    for week in weeks:
+        data = get_weekly_player_stats(week)
+        for group in groups:
+            player_ids = tuple(sorted({str(player_id) for player_id in group}))
+            key = (player_ids, week, data.version)
+            result = comparison_cache.get(key)
+            if result is None:
+                result = comparison_cache.put(key, compare_group(data, player_ids, week))
+            results.append(result)
+    return results
+
+def compare_group(data, player_ids, week=None):
+    """Compare one group from its precomputed stat vectors, returning numbers rather than rows."""
+    stats, negative_stats = (WEEKLY_COMPARISON_STATS, WEEKLY_NEGATIVE_STATS) if week else (COMPARISON_STATS, NEGATIVE_STATS)
+    players = find_players(data, player_ids)
+    if len(players) < 1:
+        return {'error': 'No valid players found for comparison', 'week': week or 'Season Total'}
     
-    # Determine winner for each stat
-    negative_stats = ['Yellow Cards', 'Red Cards', 'Cost', 'Goals Conceded']
-    
-    for stat in comparison_stats:
-        values = []
-        for player in players:
-            try:
-                value_str = str(player.get(stat, '0'))
-                value_str = value_str.replace('$', '').replace('M', '').replace('%', '')
-                value = float(value_str) if value_str else 0
-                values.append((value, player['Player ID']))
-            except (ValueError, TypeError):
-                values.append((0, player['Player ID']))
-        
+    vectors = data.stat_vectors(stats)
+    found_ids = [player['Player ID'] for player in players]
+    return {
+        'players': found_ids,
+        'week': week or 'Season Total',
+        'stats': stats,
+        'values': {stat: [vectors[player_id][index] for player_id in found_ids] for index, stat in enumerate(stats)},
+        'winner_stats': stat_winners(data, players, stats, negative_stats),
+    }
+
+def find_players(data, player_ids):
+    """Return the rows for the IDs found in data, in the order given."""
+    players = []
+    for player_id in player_ids:
+        player = data.get_player(player_id)
+        if player:
+            players.append(player)
+    return players
+
+def stat_winners(data, players, stats, negative_stats):
+    """Return {stat: winning Player ID}; lowest wins for negative stats, highest otherwise, first on ties."""
+    vectors = data.stat_vectors(stats)
+    winners = {}
+    for index, stat in enumerate(stats):
+        values = [(vectors[player['Player ID']][index], player['Player ID']) for player in players]
         if stat in negative_stats:
-            winner_id = min(values, key=lambda x: x[0])[1]
+            # For negative stats, lower is better
+            winners[stat] = min(values, key=lambda x: x[0])[1]
         else:
-            winner_id = max(values, key=lambda x: x[0])[1]
-        
-        comparison_data['winner_stats'][stat] = winner_id
-    
-    return comparison_data
+            # For positive stats, higher is better
+            winners[stat] = max(values, key=lambda x: x[0])[1]
+    return winners
 
 def get_player_by_id_weekly(player_id, week=None):
     """Get a specific player by their ID for a specific week."""
-    data = get_weekly_player_stats(week)
-    for player in data:
-        if player.get('Player ID') == str(player_id):
-            return player
-    return None
\ No newline at end of file
+    return get_weekly_player_stats(week).get_player(player_id)
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Streaming exports of player data as CSV or JSON Lines.
+
+Rows are encoded a batch at a time by generators, so an export of the whole season or of
+every week is sent with chunked transfer encoding without the full body ever being held
+in memory. Output can be gzip-compressed on the fly as it streams.
+"""
+import csv
+import io
+import zlib
+
+from data_service import dumps_json
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+# Rows encoded per chunk written to the client
+BATCH_SIZE = 500
+
+def _batches(rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        yield rows[start:start + BATCH_SIZE]
+
+def iter_csv(sections, fields):
+    """
+    Yield CSV text for sections of (prefix, rows) pairs, prefix being a dict of values
+    shared by the section's rows (e.g. its week): a header of the prefix keys and fields,
+    then one line per row with the prefix values in front of the field values.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+    for prefix, rows in sections:
+        if not header_written:
+            writer.writerow(list(prefix) + list(fields))
+            header_written = True
+        values = list(prefix.values())
+        for batch in _batches(rows):
+            writer.writerows(values + [row.get(field, '') for field in fields] for row in batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def iter_jsonl(sections, fields):
+    """Yield one JSON object per row, prefix items first, for sections of (prefix, rows) pairs."""
+    for prefix, rows in sections:
+        for batch in _batches(rows):
+            yield ''.join(
+                dumps_json({**prefix, **{field: row.get(field) for field in fields}}) + '\n'
+                for row in batch
+            )
+
+def iter_gzip(chunks):
+    """Gzip a stream of text chunks as it is produced."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def iter_export(sections, fields, export_format, compress=False):
+    """Return a generator of response body chunks for an export; see FORMATS."""
+    encode = iter_csv if export_format == 'csv' else iter_jsonl
+    chunks = encode(sections, fields)
+    if compress:
+        return iter_gzip(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
@@ -0,0 +1,22 @@
+"""
+gunicorn settings for the production server (used by the Dockerfile).
+
+The app and its data are loaded once in the master and shared copy-on-write with the
+forked workers (see wsgi.py), so extra workers cost little memory. On Fly's single
+shared CPU, a couple of processes with a few threads each keep the CPU busy while
+requests wait on the network; requests are short and mostly served from memory.
+Override with WEB_CONCURRENCY (workers) and GUNICORN_THREADS.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '80')}"
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 30
+keepalive = 5
+# Recycle workers now and then; they re-fork from the preloaded master
+max_requests = 5000
+max_requests_jitter = 500
+accesslog = '-'
@@ -0,0 +1,195 @@
+"""
+Memory accounting for the loaded datasets and caches.
+
+deep_size follows an object's references and adds up sys.getsizeof of everything it
+reaches, counting each object once, so shared values (interned strings, the RecordTable
+behind every row) are not double counted. Memory-mapped files (player_stats.bin) are
+reported apart from the heap: their pages belong to the page cache and are shared by
+every worker.
+
+Tracing with tracemalloc is off until the first snapshot is taken, since it slows every
+allocation; snapshots are kept by number so any two can be compared.
+"""
+import gc
+import mmap
+import resource
+import sys
+import threading
+import tracemalloc
+import types
+
+# Objects whose size is not attributed to the data structures that reference them
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                 types.MethodType, types.CodeType, threading.Lock().__class__)
+# PlayerDataset caches reported one by one, in the order they are measured
+DATASET_PARTS = (
+    ('by_id', 'by_id'),
+    ('sort_keys', '_sort_keys'),
+    ('sort_orders', '_sort_orders'),
+    ('sort_ranks', '_sort_ranks'),
+    ('search_text', '_search_text'),
+    ('stat_vectors', '_stat_vectors'),
+    ('serialized', '_serialized'),
+)
+MAX_SNAPSHOTS = 8
+
+def deep_size(obj, seen=None):
+    """
+    Return (heap bytes, mapped bytes) reachable from obj, skipping objects already in
+    seen (a set of ids, updated in place) so that sizes measured in turn add up.
+    """
+    seen = set() if seen is None else seen
+    heap = mapped = 0
+    pending = [obj]
+    while pending:
+        current = pending.pop()
+        if id(current) in seen or isinstance(current, _SHARED_TYPES):
+            continue
+        seen.add(id(current))
+        heap += sys.getsizeof(current)
+        if isinstance(current, mmap.mmap):
+            mapped += len(current)
+        pending.extend(gc.get_referents(current))
+    return heap, mapped
+
+def dataset_report(data, seen=None):
+    """Return a dataset's rows and the deep size of its rows (with what backs them) and of each index."""
+    seen = set() if seen is None else seen
+    # Measure the rows without descending into the indexes hanging off the dataset
+    seen.update(id(getattr(data, attribute)) for _, attribute in DATASET_PARTS)
+    parts = {}
+    heap, mapped = deep_size(data, seen)
+    parts['rows'] = heap
+    for name, attribute in DATASET_PARTS:
+        value = getattr(data, attribute)
+        seen.discard(id(value))
+        parts[name], more_mapped = deep_size(value, seen)
+        mapped += more_mapped
+    return {
+        'rows': len(data),
+        'bytes': sum(parts.values()),
+        'mapped_bytes': mapped,
+        'parts': parts,
+    }
+
+def process_memory():
+    """Current and peak resident set size of this process in bytes (current needs Linux /proc)."""
+    report = {'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    report['rss_bytes'] = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return report
+
+def memory_report(store, caches):
+    """
+    Measure every dataset the store holds, its history index and the given caches
+    ({name: object}) in one pass: an object reachable from several entries (a string
+    shared between weeks, a row held by a cache) is attributed to the first one measured.
+    """
+    datasets = store.loaded()
+    others = dict(caches)
+    history = store.loaded_history()
+    if history is not None:
+        others = {'history': history, **others}
+
+    seen = set()
+    dataset_reports = {name: dataset_report(data, seen) for name, data in datasets.items()}
+    other_sizes = {}
+    mapped = sum(report['mapped_bytes'] for report in dataset_reports.values())
+    for name, obj in others.items():
+        other_sizes[name], more_mapped = deep_size(obj, seen)
+        mapped += more_mapped
+    return {
+        'process': process_memory(),
+        'total_bytes': sum(report['bytes'] for report in dataset_reports.values()) + sum(other_sizes.values()),
+        'mapped_bytes': mapped,
+        'datasets': dataset_reports,
+        'other': other_sizes,
+        'week_store': {'estimate_bytes': store.week_nbytes, 'budget_bytes': store.week_budget},
+    }
+
+def format_report(report):
+    """Render a memory report as a few lines of text for the server log."""
+    megabytes = lambda value: f"{value / 2**20:.1f} MB"
+    process = report['process']
+    lines = [f"Memory: {megabytes(report['total_bytes'])} in datasets and caches"
+             f" ({megabytes(report['mapped_bytes'])} mapped),"
+             f" process RSS {megabytes(process.get('rss_bytes', process['peak_rss_bytes']))}"]
+    for name, dataset in report['datasets'].items():
+        largest = sorted(dataset['parts'].items(), key=lambda part: -part[1])[:3]
+        lines.append(f"  {name}: {megabytes(dataset['bytes'])} for {dataset['rows']} rows ("
+                     + ', '.join(f"{part} {megabytes(size)}" for part, size in largest) + ")")
+    for name, size in report['other'].items():
+        lines.append(f"  {name}: {megabytes(size)}")
+    return '\n'.join(lines)
+
+def _statistic(stat):
+    return {
+        'where': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        'size_bytes': stat.size,
+        'count': stat.count,
+    }
+
+class Tracer:
+    """Numbered tracemalloc snapshots of this process, the last MAX_SNAPSHOTS kept."""
+
+    def __init__(self):
+        self._snapshots = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def snapshot(self, frames=1, limit=20):
+        """
+        Take a snapshot, starting tracing (with this many frames per allocation) if it is
+        off; only allocations made after tracing starts are seen. Returns its number,
+        the traced totals and the largest allocation sites.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = snapshot
+            while len(self._snapshots) > MAX_SNAPSHOTS:
+                del self._snapshots[min(self._snapshots)]
+        current, peak = tracemalloc.get_traced_memory()
+        key = 'traceback' if tracemalloc.get_traceback_limit() > 1 else 'lineno'
+        return {
+            'id': snapshot_id,
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'top': [_statistic(stat) for stat in snapshot.statistics(key)[:limit]],
+        }
+
+    def diff(self, first, second, limit=20):
+        """Return the allocation sites that grew or shrank most from snapshot first to second."""
+        older, newer = self._snapshots.get(first), self._snapshots.get(second)
+        if older is None or newer is None:
+            raise KeyError(first if older is None else second)
+        stats = newer.compare_to(older, 'lineno')
+        return {
+            'from': first,
+            'to': second,
+            'size_diff_bytes': sum(stat.size_diff for stat in stats),
+            'top': [dict(_statistic(stat), size_diff_bytes=stat.size_diff, count_diff=stat.count_diff)
+                    for stat in stats[:limit]],
+        }
+
+    def snapshots(self):
+        return sorted(self._snapshots)
+
+    def stop(self):
+        """Drop every snapshot and stop tracing."""
+        with self._lock:
+            self._snapshots.clear()
+        tracemalloc.stop()
+
+tracer = Tracer()
@@ -0,0 +1,130 @@
+"""
+Typed player records for data loaded from CSV files.
+
+A RecordTable holds its rows as tuples of parsed values (ints and floats, with costs and
+percentages as numbers) and a schema, shared by every row, that maps each column to a
+position in the tuple or to a constant. Each column's codec is chosen at load so that
+formatting the parsed value gives back exactly the string the CSV held; rows are
+PlayerRecord views that hand out those strings on demand (for templates and JSON) and
+the numbers directly through number().
+"""
+import sys
+from collections import namedtuple
+from collections.abc import Mapping
+
+# parse turns a CSV string into the stored value, display turns it back, number gives
+# the value compared and sorted on
+Codec = namedtuple('Codec', 'name parse display number')
+
+def display_number(value):
+    """Parse a displayed value such as '$5.5M', '12.34%' or '7' as a float; anything else is 0."""
+    value_str = str(value).replace('$', '').replace('M', '').replace('%', '')
+    try:
+        return float(value_str) if value_str else 0
+    except (ValueError, TypeError):
+        return 0
+
+def _parse_money(value):
+    if not (value.startswith('$') and value.endswith('M')):
+        raise ValueError(value)
+    return float(value[1:-1])
+
+def _parse_percent(value):
+    if not value.endswith('%'):
+        raise ValueError(value)
+    return float(value[:-1])
+
+def _parse_number(value):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+NUMBER = Codec('number', _parse_number, str, lambda value: value)
+MONEY = Codec('money', _parse_money, lambda value: f"${value:.1f}M", lambda value: value)  # millions
+PERCENT = Codec('percent', _parse_percent, lambda value: f"{value:.2f}%", lambda value: value)
+TEXT = Codec('text', lambda value: sys.intern(value) if value is not None else None,
+             lambda value: value, display_number)
+CODECS = (NUMBER, MONEY, PERCENT)
+
+def infer_codec(values):
+    """Return the first codec that round-trips every value exactly, else TEXT."""
+    for codec in CODECS:
+        try:
+            if all(codec.display(codec.parse(value)) == value for value in values):
+                return codec
+        except (ValueError, TypeError, AttributeError):
+            continue
+    return TEXT
+
+class PlayerRecord(Mapping):
+    """Read-only dict-like view of one row: values as the CSV held them, numbers via number()."""
+    __slots__ = ('_table', '_values')
+
+    def __init__(self, table, values):
+        self._table = table
+        self._values = values
+
+    def __getitem__(self, name):
+        position = self._table.columns[name]
+        if position is None:
+            return self._table.constants[name]
+        return self._table.codecs[position].display(self._values[position])
+
+    def number(self, name):
+        """Return a column as a number (costs in millions, percentages as such); 0 if missing."""
+        position = self._table.columns.get(name)
+        if position is None:
+            return self._table.constant_numbers.get(name, 0)
+        return self._table.codecs[position].number(self._values[position])
+
+    def __contains__(self, name):
+        return name in self._table.columns
+
+    def __iter__(self):
+        return iter(self._table.columns)
+
+    def __len__(self):
+        return len(self._table.columns)
+
+    def __repr__(self):
+        return f"PlayerRecord({dict(self)!r})"
+
+class RecordTable:
+    """
+    Rows of CSV strings stored typed. columns maps every column, in order, to a position
+    in the row tuples or to None for a column holding the same constant string in every row.
+    """
+
+    def __init__(self, columns, rows, constants=None):
+        self.columns = dict(columns)
+        self.constants = dict(constants or {})
+        self.constant_numbers = {name: display_number(value) for name, value in self.constants.items()}
+        width = max((position + 1 for position in self.columns.values() if position is not None), default=0)
+        raw_columns = list(zip(*rows)) if rows else [()] * width
+        self.codecs = [infer_codec(values) for values in raw_columns]
+        typed_columns = [[codec.parse(value) for value in values] for codec, values in zip(self.codecs, raw_columns)]
+        self._values = list(zip(*typed_columns))
+
+    @classmethod
+    def from_dicts(cls, rows):
+        """Build a table from same-keyed dicts of strings, e.g. csv.DictReader rows."""
+        names = list(rows[0]) if rows else []
+        return cls({name: position for position, name in enumerate(names)},
+                   [tuple(row.get(name) for name in names) for row in rows])
+
+    @property
+    def num_rows(self):
+        return len(self._values)
+
+    def rows(self):
+        """Return a PlayerRecord view for every row."""
+        return [PlayerRecord(self, values) for values in self._values]
+
+    @property
+    def nbytes(self):
+        """Approximate bytes held by the row tuples and the distinct values they reference."""
+        values = {id(value): value for row in self._values for value in row}
+        return (sys.getsizeof(self._values)
+                + sum(sys.getsizeof(row) for row in self._values)
+                + sum(sys.getsizeof(value) for value in values.values()))
@@ -0,0 +1,81 @@
+"""
+In-memory cache of rendered pages, stored precompressed.
+
+A page is rendered and compressed once per (route, week) for each dataset version and
+then served straight from memory with the best Content-Encoding the client accepts.
+Brotli is used when the brotli package is installed, otherwise gzip only.
+"""
+import gzip
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# In order of preference
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=11)
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+class RenderedPage:
+    """One rendered page with its body in every supported encoding."""
+    __slots__ = ('version', 'bodies')
+
+    def __init__(self, version, body):
+        self.version = version
+        self.bodies = {'identity': body}
+        for encoding in ENCODINGS:
+            self.bodies[encoding] = compress(body, encoding)
+
+    def negotiate(self, accept_encodings):
+        """Return (encoding, body) for a werkzeug Accept-Encoding header; identity if none match."""
+        for encoding in ENCODINGS:
+            if accept_encodings[encoding]:
+                return encoding, self.bodies[encoding]
+        return 'identity', self.bodies['identity']
+
+class RenderCache:
+    """
+    Rendered pages keyed by (route, week). Each entry remembers the dataset version it
+    was rendered from, so a new dataset replaces it on the next request.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def get(self, route, week, version):
+        """Return the cached page if it was rendered from this dataset version."""
+        page = self._pages.get((route, week))
+        if page is not None and page.version == version:
+            self.hits += 1
+            return page
+        self.misses += 1
+        return None
+
+    def put(self, route, week, version, body):
+        """Compress and cache a rendered body (str or bytes), returning the RenderedPage."""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        page = RenderedPage(version, body)
+        with self._lock:
+            self._pages[(route, week)] = page
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    @property
+    def nbytes(self):
+        """Bytes held by the cached bodies, in every encoding."""
+        return sum(len(body) for page in list(self._pages.values()) for body in page.bodies.values())
+
+    def __len__(self):
+        return len(self._pages)
@@ -0,0 +1,178 @@
+"""
+Fantasy scoring rules shared by the data build (combine.py) and the Flask app.
+
+SCORING_RULES is the single source of truth for scoring. Each rule awards
+floor(stat / divisor) * multiplier points per game, where the multiplier depends on the
+player's positions and the rule only applies to games meeting all of its conditions.
+The rules are compiled once per combination of positions into scoring and decoding
+functions, and combine.py's NumPy engine vectorizes the same table.
+"""
+import operator
+from collections import namedtuple
+from functools import lru_cache
+
+# multipliers is a sequence of (positions, multiplier); the first entry matching one of the
+# player's positions wins and players matching none score nothing for the rule
+ScoringRule = namedtuple('ScoringRule', 'column stat divisor multipliers conditions')
+# An actual count shown next to a points column: the stat totalled over games meeting the conditions
+CountColumn = namedtuple('CountColumn', 'column stat conditions points_column')
+
+ANY_POSITION = None
+DEFENSIVE = ('Goalkeeper', 'Defender')
+GOALKEEPER = ('Goalkeeper',)
+MIDFIELDER = ('Midfielder',)
+
+CLEAN_SHEET = (('MIN', '>=', 60), ('GC', '==', 0))
+
+OPERATORS = {
+    '<': operator.lt, '<=': operator.le, '==': operator.eq,
+    '>=': operator.ge, '>': operator.gt,
+}
+
+# A stat of None counts one per game played. Stats the feed reports as null count as zero.
+SCORING_RULES = (
+    ScoringRule('Total MIN Points', None, 1, ((ANY_POSITION, 1),), ()),               # appearance
+    ScoringRule('Total MIN Points', None, 1, ((ANY_POSITION, 1),), (('MIN', '>', 60),)),  # over 60 minutes
+    ScoringRule('Total GL Points', 'GL', 1, ((DEFENSIVE, 6), (ANY_POSITION, 5)), ()),
+    ScoringRule('Total ASS Points', 'ASS', 1, ((ANY_POSITION, 3),), ()),
+    ScoringRule('Total YC Points', 'YC', 1, ((ANY_POSITION, -1),), ()),
+    ScoringRule('Total RC Points', 'RC', 1, ((ANY_POSITION, -3),), ()),
+    ScoringRule('Total GC Points', 'GC', 2, ((DEFENSIVE, -1),), ()),
+    ScoringRule('Total CS Points', None, 1, ((DEFENSIVE, 5), (MIDFIELDER, 1)), CLEAN_SHEET),
+    ScoringRule('Total GS Points', 'GS', 4, ((GOALKEEPER, 1),), ()),
+    ScoringRule('Total PS Points', 'PS', 1, ((GOALKEEPER, 5),), ()),
+    ScoringRule('Total PM Points', 'PM', 1, ((ANY_POSITION, -2),), ()),
+    ScoringRule('Total OG Points', 'OG', 1, ((ANY_POSITION, -2),), ()),
+    ScoringRule('Total SGS Points', 'SGS', 4, ((ANY_POSITION, 1),), ()),
+    ScoringRule('Total FS Points', 'FS', 4, ((ANY_POSITION, 1),), ()),
+    # passes are supposed to be only if 84% accuracy but we don't have that stat
+    ScoringRule('Total PSS Points', 'PSS', 35, ((ANY_POSITION, 1),), ()),
+    ScoringRule('Total CRS Points', 'CRS', 3, ((ANY_POSITION, 1),), ()),
+    ScoringRule('Total KP Points', 'KP', 4, ((ANY_POSITION, 1),), ()),
+    ScoringRule('Total CL Points', 'CL', 4, ((ANY_POSITION, 1),), ()),
+    ScoringRule('Total WF Points', 'WF', 4, ((ANY_POSITION, -1),), ()),
+)
+
+COUNT_COLUMNS = (
+    CountColumn('Actual Minutes', 'MIN', (), None),
+    CountColumn('Actual Goals', 'GL', (), 'Total GL Points'),
+    CountColumn('Actual Assists', 'ASS', (), 'Total ASS Points'),
+    CountColumn('Actual YC', 'YC', (), 'Total YC Points'),
+    CountColumn('Actual RC', 'RC', (), 'Total RC Points'),
+    CountColumn('Actual CS', None, CLEAN_SHEET, 'Total CS Points'),
+    CountColumn('Actual GC', 'GC', (), 'Total GC Points'),
+)
+
+# Point columns in CSV order, followed by their sum
+POINT_COLUMNS = tuple(dict.fromkeys(rule.column for rule in SCORING_RULES))
+COMBINED_COLUMN = 'Total Combined Points'
+COLUMN_INDEX = {column: index for index, column in enumerate(POINT_COLUMNS)}
+
+# Every raw stat code the rules and counts read
+STAT_CODES = tuple(dict.fromkeys(
+    code
+    for entry in SCORING_RULES + COUNT_COLUMNS
+    for code in (entry.stat,) + tuple(condition[0] for condition in entry.conditions)
+    if code
+))
+
+def rule_multiplier(rule, positions):
+    """Return the multiplier a rule applies for a player with the given positions (0 if ineligible)."""
+    for eligible, multiplier in rule.multipliers:
+        if eligible is ANY_POSITION or any(position in eligible for position in positions):
+            return multiplier
+    return 0
+
+def _term_source(stat, divisor, multiplier, conditions):
+    """Render one rule as a Python expression over get = stats.get, reading missing or null stats as 0."""
+    if not stat:
+        term = "1"
+    else:
+        term = f"(get({stat!r}) or 0)"
+    if divisor != 1:
+        term = f"({term} // {divisor})"
+    if multiplier != 1:
+        term = f"{term} * {multiplier}"
+    if conditions:
+        test = ' and '.join(f"(get({code!r}) or 0) {op} {value!r}" for code, op, value in conditions)
+        term = f"({term} if {test} else 0)"
+    return term
+
+@lru_cache(maxsize=None)
+def compile_scorer(positions):
+    """
+    Compile the rules for one combination of positions (a tuple) into a function that
+    returns the points for a game's stats as a list in POINT_COLUMNS order.
+    The rules are rendered into straight-line Python so a game costs one call.
+    """
+    columns = {column: [] for column in POINT_COLUMNS}
+    for rule in SCORING_RULES:
+        multiplier = rule_multiplier(rule, positions)
+        if multiplier:
+            columns[rule.column].append(_term_source(rule.stat, rule.divisor, multiplier, rule.conditions))
+
+    source = "def score_game(stats):\n    get = stats.get\n    return [{}]\n".format(
+        ', '.join(' + '.join(terms) or '0' for terms in columns.values())
+    )
+    namespace = {}
+    exec(compile(source, f"<scoring rules for {', '.join(positions)}>", 'exec'), namespace)
+    return namespace['score_game']
+
+def score_games(game_stats, positions):
+    """Return the points per column summed over games, in POINT_COLUMNS order."""
+    score_game = compile_scorer(tuple(positions))
+    totals = [0] * len(POINT_COLUMNS)
+    for game in game_stats:
+        totals = [total + points for total, points in zip(totals, score_game(game['stats']))]
+    return totals
+
+def point_totals(game_stats, positions):
+    """Return {points column: total} for a player's games, including the combined total."""
+    totals = dict(zip(POINT_COLUMNS, score_games(game_stats, positions)))
+    totals[COMBINED_COLUMN] = sum(totals.values())
+    return totals
+
+def game_points(game, positions):
+    """Return the total fantasy points for a single game."""
+    return sum(compile_scorer(tuple(positions))(game['stats']))
+
+@lru_cache(maxsize=None)
+def compile_counter():
+    """Compile COUNT_COLUMNS into a function returning a game's counts as a list in column order."""
+    terms = (_term_source(count.stat, 1, 1, count.conditions) for count in COUNT_COLUMNS)
+    source = "def count_game(stats):\n    get = stats.get\n    return [{}]\n".format(', '.join(terms))
+    namespace = {}
+    exec(compile(source, "<actual counts>", 'exec'), namespace)
+    return namespace['count_game']
+
+def count_totals(game_stats):
+    """Return {actual count column: total} for a player's games."""
+    count_game = compile_counter()
+    totals = [0] * len(COUNT_COLUMNS)
+    for game in game_stats:
+        totals = [total + count for total, count in zip(totals, count_game(game['stats']))]
+    return dict(zip((count.column for count in COUNT_COLUMNS), totals))
+
+@lru_cache(maxsize=None)
+def compile_decoder(positions):
+    """Return (count column, points column, multiplier, divisor) for each decodable count."""
+    decoders = []
+    for count in COUNT_COLUMNS:
+        if count.points_column is None:
+            continue
+        rule = next(rule for rule in SCORING_RULES if rule.column == count.points_column)
+        decoders.append((count.column, count.points_column, rule_multiplier(rule, positions), rule.divisor))
+    return tuple(decoders)
+
+def decode_actual_counts(row):
+    """
+    Recover actual counts (as strings) from the points columns of a player_stats.csv row.
+    Only needed for CSVs built before combine.py exported the counts directly. Minutes
+    cannot be recovered from points, so the minutes points are shown instead.
+    """
+    counts = {'Actual Minutes': row.get('Total MIN Points', '0')}
+    for column, points_column, multiplier, divisor in compile_decoder(tuple(row.get('Positions', '').split(', '))):
+        points = int(row.get(points_column) or 0)
+        units = points // multiplier if multiplier else 0
+        counts[column] = str(units * divisor if units > 0 else 0)
+    return counts
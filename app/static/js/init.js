@@ -18,6 +18,81 @@ document.addEventListener('DOMContentLoaded', function() {
     // Initialize dark mode (independent of other components)
     initDarkMode();
     
+    // Escape a value from the API for use as cell HTML
+    function escapeHtml(value) {
+        return $('<div>').text(value == null ? '' : value).html();
+    }
+    
+    // Render a points column with its actual count, e.g. "10 (2)"
+    function withCount(countColumn) {
+        return function(points, type, row) {
+            if (type !== 'display' || points == null) {
+                return points;
+            }
+            return '<span class="stat-value">' + escapeHtml(points) + '</span> ' +
+                '<small class="text-muted">(' + escapeHtml(row[countColumn]) + ')</small>';
+        };
+    }
+    
+    // Table columns in header order; each is sorted by its data column on the server
+    function tableColumns() {
+        return [
+            { data: 'Player ID' },
+            { data: 'Name', className: 'player-name-cell', render: function(value, type) {
+                return type === 'display' ? '<strong>' + escapeHtml(value) + '</strong>' : value;
+            } },
+            { data: 'Team', render: $.fn.dataTable.render.text() },
+            { data: 'Cost', className: 'cost-cell' },
+            { data: 'Owned By' },
+            { data: 'Total Points', className: 'stat-highlight' },
+            { data: 'Average Points' },
+            { data: 'Positions', className: 'position-cell' },
+            { data: 'Total Combined Points', className: 'combined-pts' },
+            { data: 'Total MIN Points', render: withCount('Actual Minutes') },
+            { data: 'Total GL Points', render: withCount('Actual Goals') },
+            { data: 'Total ASS Points', render: withCount('Actual Assists') },
+            { data: 'Total YC Points', render: withCount('Actual YC') },
+            { data: 'Total RC Points', render: withCount('Actual RC') },
+            { data: 'Total GC Points', render: withCount('Actual GC') },
+            { data: 'Total CS Points', render: withCount('Actual CS') },
+            { data: 'Total GS Points' },
+            { data: 'Total PS Points' },
+            { data: 'Total PM Points' },
+            { data: 'Total OG Points' },
+            { data: 'Total SGS Points' },
+            { data: 'Total FS Points' },
+            { data: 'Total KP Points' },
+            { data: 'Total CRS Points' },
+            { data: 'Total CL Points' },
+            { data: 'Total WF Points' },
+            { data: 'Total PSS Points' }
+        ];
+    }
+    
+    // Filters sent with every table request, as /api/players and /api/export read them
+    function currentFilters() {
+        const filters = {};
+        const week = $('#week-filter').val();
+        if (week) {
+            filters.week = week;
+        }
+        const inputs = {
+            position: '#position-filter',
+            min_goals: '#goal-filter',
+            min_assists: '#assist-filter',
+            min_points: '#points-filter',
+            min_price: '#price-filter',
+            max_price: '#price-max-filter'
+        };
+        for (const name in inputs) {
+            const value = $(inputs[name]).val();
+            if (value) {
+                filters[name] = value;
+            }
+        }
+        return filters;
+    }
+    
     // Function to initialize DataTable
     function initDataTable() {
         if ($('#player-stats').length === 0) {
@@ -25,16 +100,19 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
         
-        // Add custom sorting for data-sort attributes
-        $.fn.dataTable.ext.order['dom-data-sort'] = function(settings, col) {
-            return this.api().column(col, {order: 'index'}).nodes().map(function(td) {
-                var sortValue = $(td).attr('data-sort');
-                return sortValue ? parseFloat(sortValue) || 0 : 0;
-            });
-        };
-        
         try {
             var table = $('#player-stats').DataTable({
+                // Rows are paged, sorted and filtered by /api/players; the page ships without them
+                serverSide: true,
+                processing: true,
+                ajax: {
+                    url: '/api/players',
+                    data: function(params) {
+                        Object.assign(params, currentFilters());
+                    }
+                },
+                searchDelay: 300,
+                columns: tableColumns(),
                 scrollX: true,
                 fixedHeader: true,
                 colReorder: true,
@@ -57,18 +135,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 // Updated columnDefs with removed columns
                 columnDefs: [
                     { targets: [8, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26], visible: false },
-                    { targets: [0], type: 'num' }, // Player ID
-                    { targets: [3, 5, 6], type: 'num' }, // Cost, Total Points, Average Points  
-                    { 
-                        targets: [9, 10, 11, 12, 13, 14, 15], // Minutes, Goals, Assists, YC, RC, GC, CS columns
-                        type: 'num',
-                        orderDataType: 'dom-data-sort' // Use data-sort attribute for sorting
-                    },
-                    { targets: '_all', orderSequence: ['desc', 'asc'] }
-                ],
-                searchBuilder: {
-                    container: $('#search-builder-container')
-                }
+                    { targets: '_all', orderSequence: ['desc', 'asc'], defaultContent: '' }
+                ]
             });
             
             // Store reference in global namespace
@@ -109,17 +177,6 @@ document.addEventListener('DOMContentLoaded', function() {
         // Column visibility toggles
         setupColumnToggles(table);
         
-        // Advanced filters toggle
-        $('#toggle-search-builder').on('click', function() {
-            $('#search-builder-container').toggle();
-            if ($('#search-builder-container').is(':visible')) {
-                $(this).html('<i class="fas fa-times me-1"></i> Hide Advanced Filters');
-                table.searchBuilder.rebuild();
-            } else {
-                $(this).html('<i class="fas fa-sliders me-1"></i> Advanced Filters');
-            }
-        });
-        
         // Export CSV button
         $('#export-csv').on('click', setupExportCSV(table));
     }
@@ -391,50 +448,19 @@ document.addEventListener('DOMContentLoaded', function() {
     // Function to setup CSV export
     function setupExportCSV(table) {
         return function() {
-            // Get the current filtered data
-            var filteredData = table.rows({ search: 'applied' }).data();
-            
-            // Convert to CSV format
-            var csvContent = [];
-            
-            // Add header row
-            var headerRow = [];
-            $('#player-stats thead th').each(function() {
-                if (table.column($(this).index()).visible()) {
-                    headerRow.push('"' + $(this).text() + '"');
-                }
-            });
-            csvContent.push(headerRow.join(','));
-            
-            // Add data rows
-            table.rows({ search: 'applied' }).every(function(rowIdx) {
-                var dataRow = [];
-                var rowData = this.data();
-                
-                $('#player-stats thead th').each(function(colIdx) {
-                    if (table.column(colIdx).visible()) {
-                        dataRow.push('"' + rowData[colIdx] + '"');
-                    }
-                });
-                
-                csvContent.push(dataRow.join(','));
-            });
-            
-            // Create downloadable link
-            var csvString = csvContent.join('\n');
-            var blob = new Blob([csvString], { type: 'text/csv;charset=utf-8;' });
-            var link = document.createElement('a');
-            
-            // Create a URL for the blob
-            var url = URL.createObjectURL(blob);
-            link.setAttribute('href', url);
-            link.setAttribute('download', 'player_stats_export.csv');
-            link.style.visibility = 'hidden';
-            
-            // Append to the document, click it, and remove it
-            document.body.appendChild(link);
-            link.click();
-            document.body.removeChild(link);
+            // The server streams every row matching the filters, search and sort, not just this page
+            const params = currentFilters();
+            params.format = 'csv';
+            params.search = table.search();
+            params.sort = table.order().map(function(orderInfo) {
+                const column = table.column(orderInfo[0]).dataSrc();
+                return (orderInfo[1] === 'desc' ? '-' : '') + column;
+            }).join(',');
+            if (!params.week) {
+                // Weekly files have their own columns, so a week is exported in full
+                params.fields = table.columns(':visible').dataSrc().toArray().join(',');
+            }
+            window.location.href = '/api/export?' + $.param(params);
         };
     }
     
@@ -469,81 +495,8 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Function to apply all filters
     function applyFilters(table) {
-        let positionVal = $('#position-filter').val();
-        let goalVal = $('#goal-filter').val();
-        let assistVal = $('#assist-filter').val();
-        let pointsVal = $('#points-filter').val();
-        let priceMinVal = $('#price-filter').val();
-        let priceMaxVal = $('#price-max-filter').val();
-        
-        console.log('Applying filters:', {
-            position: positionVal,
-            goals: goalVal,
-            assists: assistVal,
-            points: pointsVal,
-            minPrice: priceMinVal,
-            maxPrice: priceMaxVal
-        });
-        
-        // Clear previous filters
-        table.search('').columns().search('');
-        $.fn.dataTable.ext.search = [];
-        
-        // Apply position filter
-        if (positionVal) {
-            table.column(7).search(positionVal, true, false);
-        }
-        
-        // Setup numeric filters
-        if (goalVal || assistVal || pointsVal || priceMinVal || priceMaxVal) {
-            $.fn.dataTable.ext.search.push(
-                function(settings, data, dataIndex) {
-                    let pass = true;
-                    
-                    // Goals filter
-                    if (goalVal && pass) {
-                        let value = parseFloat(data[10]) || 0;
-                        pass = value >= parseFloat(goalVal);
-                    }
-                    
-                    // Assists filter
-                    if (assistVal && pass) {
-                        let value = parseFloat(data[11]) || 0;
-                        pass = value >= parseFloat(assistVal);
-                    }
-                    
-                    // Total Points filter
-                    if (pointsVal && pass) {
-                        let value = parseFloat(data[5]) || 0;
-                        pass = value >= parseFloat(pointsVal);
-                    }
-                    
-                    // Helper function to get cost value
-                    let costValue;
-                    function getCostValue() {
-                        if (costValue === undefined) {
-                            let costString = data[3];
-                            costValue = parseFloat(costString.replace(/[^0-9.]/g, '')) * 1000000 || 0;
-                        }
-                        return costValue;
-                    }
-                    
-                    // Min price filter
-                    if (priceMinVal && pass) {
-                        pass = getCostValue() >= parseFloat(priceMinVal);
-                    }
-                    
-                    // Max price filter
-                    if (priceMaxVal && pass) {
-                        pass = getCostValue() <= parseFloat(priceMaxVal);
-                    }
-                    
-                    return pass;
-                }
-            );
-        }
-        
-        // Apply all filters
+        // The filter values are read by the ajax request (see currentFilters)
+        console.log('Applying filters:', currentFilters());
         table.draw();
     }
     
@@ -559,9 +512,7 @@ document.addEventListener('DOMContentLoaded', function() {
         $('#price-filter').val('').prop('selectedIndex', 0).trigger('change');
         $('#price-max-filter').val('').prop('selectedIndex', 0).trigger('change');
         
-        // Clear all DataTables filters
-        $.fn.dataTable.ext.search = [];
-        table.search('').columns().search('').draw();
+        table.search('').draw();
         
         console.log('Filters reset');
     }
@@ -0,0 +1,81 @@
+"""
+Compact in-memory form of the weekly CSVs in weekly_data/.
+
+Each week is a records.RecordTable: one tuple of typed values per row. The columns the
+pages expect (the weekly columns, the season columns they stand in for and the
+season-only columns the weekly files lack) are described once per week by a schema that
+maps every column to a position in the tuple or to a constant, so derived and constant
+columns are not copied into every row.
+"""
+import csv
+
+from records import RecordTable
+
+# Weekly column -> season columns showing the same value, so the main stats page can show a week
+SEASON_ALIASES = (
+    ('Minutes', ('Total MIN Points',)),
+    ('Goals', ('Total GL Points', 'Actual Goals')),  # For weekly data, goals are actual goals
+    ('Assists', ('Total ASS Points', 'Actual Assists')),
+    ('Yellow Cards', ('Total YC Points', 'Actual YC')),
+    ('Red Cards', ('Total RC Points', 'Actual RC')),
+    ('Goals Conceded', ('Total GC Points', 'Actual GC')),
+    ('Clean Sheets', ('Total CS Points', 'Actual CS')),
+    ('Minutes', ('Actual Minutes',)),
+    ('Shots on Goal', ('Total SGS Points',)),
+    ('Key Passes', ('Total KP Points',)),
+)
+
+# Season columns the weekly data does not have: a constant, or the weekly column standing in for it
+SEASON_ONLY_COLUMNS = (
+    ('Owned By', '0%', None),  # Not available in weekly data
+    ('High Score', '0', 'Total Points'),
+    ('Low Score', '0', None),
+    ('Total Combined Points', '0', 'Total Points'),
+    ('Total GS Points', '0', None),  # Goalkeeper saves
+    ('Total PS Points', '0', None),  # Penalty saves
+    ('Total PM Points', '0', None),  # Penalty misses
+    ('Total OG Points', '0', None),  # Own goals
+    ('Total FS Points', '0', None),  # Fouls
+    ('Total PSS Points', '0', None),  # Passes
+    ('Total CRS Points', '0', None),  # Crosses
+    ('Total CL Points', '0', None),  # Clearances
+    ('Total WF Points', '0', None),  # Won fouls
+)
+
+def week_schema(header):
+    """
+    Return (columns, constants) for a weekly CSV header: columns maps every column, in
+    the order the pages see them, to its position in a row tuple or to None for constants.
+    """
+    columns = {name: position for position, name in enumerate(header)}
+    constants = {}
+    for source, aliases in SEASON_ALIASES:
+        if source in columns:
+            for alias in aliases:
+                columns[alias] = columns[source]
+                constants.pop(alias, None)
+    for name, default, source in SEASON_ONLY_COLUMNS:
+        if source is not None and source in columns:
+            columns[name] = columns[source]
+            constants.pop(name, None)
+        else:
+            columns[name] = None
+            constants[name] = default
+    return columns, constants
+
+def read_week_table(path):
+    """Read a weekly CSV file into a RecordTable."""
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, [])
+        width = len(header)
+        values = []
+        for record in reader:
+            if not record:
+                continue
+            # Short rows read as None for their missing fields, as csv.DictReader does
+            if len(record) < width:
+                record = record + [None] * (width - len(record))
+            values.append(tuple(record[:width]))
+    columns, constants = week_schema(header)
+    return RecordTable(columns, values, constants)
@@ -0,0 +1,32 @@
+"""
+Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+
+Imported once in the gunicorn master (preload_app). Every dataset, index and the season
+pages are built here before the workers are forked, then gc.freeze() moves them out of
+the collector's generations so that collections in the workers do not touch (and copy)
+the shared pages.
+"""
+import gc
+
+from app import app, render_cache, memory_caches
+from data_service import store, get_available_weeks
+from memory_report import memory_report, format_report
+
+def preload():
+    # No reload watcher in the master: a thread running at fork time is not copied and
+    # could leave a lock held; each worker starts its own on its first request
+    interval, store.interval = store.interval, 0
+    try:
+        store.preload(get_available_weeks())
+        # Render and compress the season pages once for every worker
+        client = app.test_client()
+        for path in ('/', '/compare', '/draft'):
+            client.get(path, headers={'Accept-Encoding': 'br, gzip'})
+    finally:
+        store.interval = interval
+    gc.collect()
+    gc.freeze()
+    print(f"Preloaded data and {len(render_cache)} pages; {gc.get_freeze_count()} objects frozen")
+    print(format_report(memory_report(store, memory_caches())))
+
+preload()
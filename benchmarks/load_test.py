@@ -0,0 +1,301 @@
+"""
+HTTP load test of the app as deployed: gunicorn with gunicorn.conf.py and wsgi:app.
+
+Starts the production server locally on a synthetic league (or targets --url), then, for
+each concurrency level, runs that many clients in a closed loop for --duration seconds
+replaying a mix of page loads across weeks, compare calls with 2-6 players and API pulls.
+Reports throughput, p50/p95/p99 latency and the RSS of each gunicorn worker, and writes
+the full results as JSON.
+
+    python benchmarks/load_test.py [--concurrency 1,4,16,32] [--duration 10] \\
+        [--workers 2] [--threads 4] [--players 800] [--output load_results.json]
+
+The clients run in this process, so on a small machine they compete with the server for
+CPU; for sizing, run the server on the target machine and point --url at it.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_league import write_dataset
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+# Request kinds and their share of the traffic
+MIX = (
+    ('page', 0.5),
+    ('compare', 0.3),
+    ('api', 0.2),
+)
+PAGES = ('/', '/compare', '/draft')
+
+class Traffic:
+    """Builds request paths for the mix from the league's weeks and player IDs."""
+
+    def __init__(self, weeks, player_ids, seed=0):
+        self.weeks = weeks
+        self.player_ids = [str(player_id) for player_id in player_ids]
+        self.rng = random.Random(seed)
+        self.kinds = [kind for kind, _ in MIX]
+        self.weights = [share for _, share in MIX]
+
+    def week(self):
+        """The season totals half of the time, otherwise a random week."""
+        if not self.weeks or self.rng.random() < 0.5:
+            return None
+        return self.rng.choice(self.weeks)
+
+    def players(self, low, high):
+        return self.rng.sample(self.player_ids, min(len(self.player_ids), self.rng.randint(low, high)))
+
+    def next(self):
+        """Return (kind, path) for the next request."""
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        week = self.week()
+        week_param = f"week={week}" if week else ''
+        if kind == 'page':
+            path = self.rng.choice(PAGES)
+            return kind, f"{path}?{week_param}" if week else path
+        if kind == 'compare':
+            params = [f"players={player_id}" for player_id in self.players(2, 6)]
+            return kind, '/api/compare?' + '&'.join(params + ([week_param] if week else []))
+        choice = self.rng.random()
+        if choice < 0.4:
+            return kind, '/api/players' + (f"?{week_param}" if week else '')
+        if choice < 0.8:
+            start = self.rng.randrange(0, max(len(self.player_ids) - 25, 1))
+            return kind, (f"/api/players?draw=1&start={start}&length=25&order[0][column]=0&order[0][dir]=desc"
+                          f"&columns[0][data]=Total Points" + (f"&{week_param}" if week else ''))
+        return kind, f"/api/players/{','.join(self.players(1, 3))}/history"
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': latencies[-1] if latencies else None,
+    }
+
+def run_level(base_url, traffic_seed, weeks, player_ids, concurrency, duration, warmup):
+    """Run concurrency closed-loop clients; returns latencies (ms) by kind, error count and elapsed seconds."""
+    latencies = {kind: [] for kind, _ in MIX}
+    errors = []
+    lock = threading.Lock()
+    start_at = time.perf_counter() + warmup
+    stop_at = start_at + duration
+
+    def client(index):
+        traffic = Traffic(weeks, player_ids, seed=traffic_seed * 1000 + index)
+        session = requests.Session()
+        session.headers['Accept-Encoding'] = 'gzip'
+        mine = {kind: [] for kind, _ in MIX}
+        failed = 0
+        while True:
+            kind, path = traffic.next()
+            started = time.perf_counter()
+            if started >= stop_at:
+                break
+            try:
+                response = session.get(base_url + path, timeout=30)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            finished = time.perf_counter()
+            if started >= start_at:  # requests made during the warmup are not counted
+                if ok:
+                    mine[kind].append((finished - started) * 1000)
+                else:
+                    failed += 1
+        session.close()
+        with lock:
+            for kind, values in mine.items():
+                latencies[kind].extend(values)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(errors), duration
+
+def child_pids(pid):
+    """Return the PIDs of a process's children (Linux /proc)."""
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+def rss_mb(pid):
+    """Resident set size of a process in MB (Linux /proc), or None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+class Server:
+    """The production gunicorn server over a data directory, started in a subprocess."""
+
+    def __init__(self, data_dir, port, workers, threads, log_path):
+        env = dict(os.environ, DATA_DIR=data_dir, PORT=str(port), WEB_CONCURRENCY=str(workers),
+                   GUNICORN_THREADS=str(threads))
+        self.log = open(log_path, 'w')
+        self.process = subprocess.Popen(['gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], cwd=APP_DIR,
+                                        env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    def log_tail(self, lines=20):
+        self.log.flush()
+        with open(self.log.name) as f:
+            return ''.join(f.readlines()[-lines:])
+
+    def wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with status {self.process.returncode}:\n{self.log_tail()}")
+            try:
+                if requests.get(self.base_url + '/api/players?fields=Player ID', timeout=2).ok:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"gunicorn did not start within {timeout}s:\n{self.log_tail()}")
+
+    def memory(self):
+        """RSS in MB of the master and each worker."""
+        return {
+            'master_mb': rss_mb(self.process.pid),
+            'workers_mb': [rss_mb(pid) for pid in child_pids(self.process.pid)],
+        }
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+def fetch_league(base_url):
+    """Read the weeks (from the main page's week filter) and player IDs to request from a server."""
+    players = requests.get(base_url + '/api/players?fields=Player ID&format=compact', timeout=30).json()
+    page = requests.get(base_url + '/', timeout=30).text
+    weeks = list(dict.fromkeys(re.findall(r'<option value="(Week \d+)"', page)))
+    return weeks, [row[0] for row in players['rows']]
+
+def format_number(value):
+    return f"{value:8.1f}" if value is not None else '     n/a'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', default='1,4,16,32', help="comma-separated client counts to sweep")
+    parser.add_argument('--duration', type=float, default=10, help="measured seconds per level")
+    parser.add_argument('--warmup', type=float, default=2, help="unmeasured seconds before each level")
+    parser.add_argument('--url', help="load an already running server instead of starting one")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers (WEB_CONCURRENCY)")
+    parser.add_argument('--threads', type=int, default=4, help="threads per worker (GUNICORN_THREADS)")
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--players', type=int, default=800)
+    parser.add_argument('--games', type=int, default=34, help="rounds per season")
+    parser.add_argument('--seasons', type=int, default=1)
+    parser.add_argument('--output', default='load_results.json')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        server = None
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            data_dir = os.path.join(work_dir, 'data')
+            with contextlib.redirect_stdout(io.StringIO()):
+                write_dataset(data_dir, args.players, args.games, args.seasons)
+            server = Server(data_dir, args.port, args.workers, args.threads, os.path.join(work_dir, 'gunicorn.log'))
+            base_url = server.base_url
+        try:
+            if server:
+                server.wait_ready()
+            weeks, player_ids = fetch_league(base_url)
+            print(f"{base_url}: {len(player_ids)} players, {len(weeks)} weeks")
+            if server:
+                memory = server.memory()
+                print(f"Started: master {format_number(memory['master_mb'])} MB, workers "
+                      + ', '.join(f"{value:.1f}" for value in memory['workers_mb'] if value) + " MB")
+            print(f"\n{'clients':>7} {'req/s':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+                  f" {'max RSS MB':>10}")
+
+            results = []
+            for level, concurrency in enumerate(levels):
+                latencies, errors, elapsed = run_level(base_url, level, weeks, player_ids, concurrency,
+                                                       args.duration, args.warmup)
+                overall = summarize([value for values in latencies.values() for value in values])
+                result = {
+                    'concurrency': concurrency,
+                    'throughput_rps': overall['requests'] / elapsed,
+                    'errors': errors,
+                    **overall,
+                    'by_kind': {kind: summarize(values) for kind, values in latencies.items()},
+                }
+                if server:
+                    result['memory'] = server.memory()
+                results.append(result)
+                workers = [value for value in result.get('memory', {}).get('workers_mb', []) if value]
+                print(f"{concurrency:>7} {result['throughput_rps']:8.1f} {errors:>6} {format_number(overall['p50_ms'])}"
+                      f" {format_number(overall['p95_ms'])} {format_number(overall['p99_ms'])}"
+                      f" {format_number(max(workers) if workers else None):>10}")
+        finally:
+            if server:
+                server.stop()
+
+    report = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'url': args.url,
+            'workers': None if args.url else args.workers,
+            'threads': None if args.url else args.threads,
+            'players': len(player_ids),
+            'weeks': len(weeks),
+            'duration': args.duration,
+            'mix': dict(MIX),
+        },
+        'levels': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+if __name__ == '__main__':
+    main()
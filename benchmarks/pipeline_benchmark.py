@@ -0,0 +1,286 @@
+"""
+Time every stage of the data pipeline and the app on a synthetic league.
+
+Generates feeds with synthetic_league.py and serves them locally, then times fetching
+(cold and revalidated against the feed cache, plus one worker against many with latency
+injected into every response), scoring, weekly generation, CSV export, a
+full and an incremental combine.py build, loading the data in the app and the main Flask
+routes through the test client. Results are written as JSON so runs on different commits
+can be compared:
+
+    python benchmarks/pipeline_benchmark.py [--players 800] [--games 34] [--seasons 1] \\
+        [--delay 0.02] [--output benchmark_results.json] [--baseline previous_results.json]
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import combine
+import columnar  # from app/, which combine.py puts on sys.path
+from synthetic_league import FeedServer, write_feeds
+
+# Flask routes timed through the test client; {week} and {players} are filled in per league
+ROUTES = (
+    ('index', '/'),
+    ('index_week', '/?week={week}'),
+    ('compare_page', '/compare'),
+    ('draft_page', '/draft'),
+    ('players_api', '/api/players'),
+    ('players_table_api', '/api/players?draw=1&start=0&length=25&order[0][column]=0&order[0][dir]=desc'
+                          '&columns[0][data]=Total Points&search[value]=F1'),
+    ('compare_api', '/api/compare?{players}'),
+    ('compare_api_week', '/api/compare?{players}&week={week}'),
+    ('history_api', '/api/players/{ids}/history'),
+    ('export_csv', '/api/export?week=all'),
+)
+
+class Recorder:
+    """Collects the timings of each stage, in seconds."""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.stages = {}
+
+    def time(self, name, func, repeat=None, setup=None):
+        """Run func repeat times (setup before each run, untimed) and record the timings."""
+        timings = []
+        result = None
+        for _ in range(repeat or self.repeat):
+            if setup:
+                setup()
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                result = func()
+                timings.append(time.perf_counter() - start)
+        self.stages[name] = {
+            'best': min(timings),
+            'median': statistics.median(timings),
+            'runs': timings,
+        }
+        print(f"{name:<28} {min(timings) * 1000:10.1f} ms  (median {statistics.median(timings) * 1000:.1f} ms)")
+        return result
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def bench_fetch_latency(recorder, feed_dir, player_ids, workers, delay):
+    """
+    Time fetching game stats for player_ids with one worker and with workers, from a
+    server that delays every response by delay seconds, as the remote feed host does.
+    """
+    with FeedServer(feed_dir, delay=delay) as base_url:
+        timings = {}
+        for count in dict.fromkeys((1, workers)):
+            name = f"fetch.latency.workers_{count}"
+            recorder.time(name, lambda: combine.fetch_all_game_stats(player_ids, max_workers=count,
+                                                                     base_url=base_url), repeat=1)
+            timings[count] = recorder.stages[name]['best']
+    if workers != 1:
+        print(f"{'':<28} {timings[1] / timings[workers]:10.1f}x faster with {workers} workers"
+              f" at {delay * 1000:.0f} ms per request")
+
+def check_columnar_round_trip(rows, work_dir):
+    """Check that rows written as player_stats.bin read back exactly as player_stats.csv does."""
+    csv_path = os.path.join(work_dir, 'round_trip.csv')
+    table_path = os.path.join(work_dir, 'round_trip.bin')
+    with contextlib.redirect_stdout(io.StringIO()):
+        combine.export_to_csv(rows, csv_path)
+    columnar.write_table(table_path, rows)
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        csv_rows = list(csv.DictReader(f))
+    table_rows = [dict(row) for row in columnar.open_table(table_path).rows()]
+    assert table_rows == csv_rows, next(
+        (csv_row, table_row) for csv_row, table_row in zip(csv_rows, table_rows) if csv_row != table_row)
+
+def bench_pipeline(recorder, base_url, work_dir, workers):
+    """Time the combine.py stages one by one, writing the app's data files to work_dir/app."""
+    data_dir = os.path.join(work_dir, 'app')
+    weekly_dir = os.path.join(data_dir, 'weekly_data')
+    cache_dir = os.path.join(work_dir, 'feed_cache')
+
+    def fetch(cache=None):
+        teams = combine.fetch_all_team_data(None, base_url, cache_dir=cache)
+        players = combine.fetch_all_player_data(None, base_url, cache_dir=cache)
+        calendar = combine.fetch_round_calendar(None, base_url, cache_dir=cache)
+        player_index = combine.build_player_index(players, teams)
+        game_stats = combine.fetch_all_game_stats(list(player_index), max_workers=workers,
+                                                  base_url=base_url, cache_dir=cache)
+        return calendar, player_index, game_stats
+
+    calendar, player_index, all_game_stats = recorder.time('fetch.cold', fetch)
+    fetch(cache_dir)  # fill the cache
+    recorder.time('fetch.revalidate', lambda: fetch(cache_dir))
+
+    recorder.time('scoring.per_game', lambda: {
+        player_id: combine.score_player(game_stats, player_index[player_id], calendar.week_of)
+        for player_id, game_stats in all_game_stats.items()
+    })
+    if combine.scoring_engine is not None:
+        recorder.time('scoring.vectorized', lambda: combine.score_players(all_game_stats, player_index,
+                                                                          calendar.week_of))
+    players_state = combine.score_players(all_game_stats, player_index, calendar.week_of)
+
+    def weekly_data():
+        weeks = {}
+        for player_id, entry in players_state.items():
+            for week, week_totals in entry['weeks'].items():
+                weeks.setdefault(week, {})[player_id] = week_totals
+        return weeks
+
+    weeks = recorder.time('weekly.group', weekly_data)
+    recorder.time('weekly.write', lambda: combine.write_weekly_files(weeks, player_index, weekly_dir=weekly_dir))
+
+    season_rows = [
+        combine.format_season_row(player_index[player_id], entry['point_totals'], entry['counts'])
+        for player_id, entry in players_state.items() if entry['point_totals'] is not None
+    ]
+    recorder.time('export.csv', lambda: combine.export_to_csv(season_rows, os.path.join(data_dir, 'player_stats.csv')))
+    recorder.time('export.columnar', lambda: columnar.write_table(os.path.join(data_dir, 'player_stats.bin'), season_rows))
+
+    # Missing values must read back from the .bin as the CSV writes them
+    rows_with_missing = [dict(row) for row in season_rows]
+    for row, column in zip(rows_with_missing, ('Team', 'High Score', 'Total GL Points', 'Positions')):
+        row[column] = None
+    check_columnar_round_trip(season_rows, work_dir)
+    check_columnar_round_trip(rows_with_missing, work_dir)
+    print(f"{'':<28} player_stats.bin matches player_stats.csv")
+    return data_dir, list(player_index)
+
+def bench_build(recorder, base_url, work_dir, workers):
+    """Time combine.main end to end, from scratch and then incrementally with nothing changed."""
+    build_dir = os.path.join(work_dir, 'build')
+    os.makedirs(build_dir, exist_ok=True)
+    argv = ['--base-url', base_url, '--workers', str(workers),
+            '--cache-dir', os.path.join(build_dir, 'feed_cache'),
+            '--state-file', os.path.join(build_dir, 'build_state.json')]
+
+    cwd = os.getcwd()
+    os.chdir(build_dir)  # combine.py writes its outputs to the working directory
+    try:
+        recorder.time('build.full', lambda: combine.main(argv + ['--full']),
+                      setup=lambda: shutil.rmtree('feed_cache', ignore_errors=True))
+        recorder.time('build.incremental', lambda: combine.main(argv))
+    finally:
+        os.chdir(cwd)
+
+def bench_app(recorder, data_dir, player_ids, route_repeat):
+    """Time loading the data written by bench_pipeline and the main routes."""
+    os.environ['DATA_DIR'] = data_dir
+    os.environ['DATA_RELOAD_INTERVAL'] = '0'
+    sys.path.insert(0, os.path.join(ROOT, 'app'))
+    import data_service
+    from app import app, render_cache
+
+    weeks = data_service.get_available_weeks()
+    recorder.time('app.load_season', data_service.load_player_stats)
+    recorder.time('app.load_weeks', lambda: [data_service.load_weekly_player_stats(week) for week in weeks])
+    recorder.time('app.preload', lambda: data_service.store.preload(weeks), repeat=1)  # loads once
+
+    client = app.test_client()
+    ids = [str(player_id) for player_id in player_ids[:4]]
+    values = {
+        'week': weeks[len(weeks) // 2] if weeks else '',
+        'players': '&'.join(f"players={player_id}" for player_id in ids),
+        'ids': ','.join(ids),
+    }
+
+    def get(url):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        return response.data
+
+    # .cold is the first request with an empty render cache
+    for name, route in ROUTES:
+        url = route.format(**values)
+        recorder.time(f"route.{name}.cold", lambda: get(url), repeat=1, setup=render_cache.clear)
+        recorder.time(f"route.{name}", lambda: get(url), repeat=route_repeat)
+
+def compare_results(results, baseline, threshold):
+    """Print each stage's best time against a baseline run, flagging slowdowns past threshold."""
+    print(f"\nAgainst {baseline['meta'].get('commit') or 'baseline'}:")
+    scale = ('players', 'games', 'seasons')
+    if any(results['meta'][key] != baseline['meta'].get(key) for key in scale):
+        print("(the baseline was run at a different scale)")
+    for name, stage in results['stages'].items():
+        before = baseline['stages'].get(name)
+        if not before:
+            continue
+        ratio = stage['best'] / before['best'] if before['best'] else float('inf')
+        flag = '  <-- slower' if ratio > 1 + threshold else ''
+        print(f"{name:<28} {before['best'] * 1000:10.1f} -> {stage['best'] * 1000:10.1f} ms ({ratio:5.2f}x){flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=800)
+    parser.add_argument('--games', type=int, default=34, help="rounds per season")
+    parser.add_argument('--seasons', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3, help="runs of each pipeline stage")
+    parser.add_argument('--route-repeat', type=int, default=20, help="requests per route")
+    parser.add_argument('--workers', type=int, default=combine.FETCH_WORKERS)
+    parser.add_argument('--delay', type=float, default=0.02,
+                        help="latency in seconds added to each response for the fetch.latency stages (0 skips them)")
+    parser.add_argument('--latency-players', type=int, default=200,
+                        help="players fetched in the fetch.latency stages")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="results file of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="slowdown against the baseline to flag (default: 0.1 = 10%%)")
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'vectorized_engine': combine.scoring_engine is not None,
+            'players': args.players,
+            'games': args.games,
+            'seasons': args.seasons,
+            'repeat': args.repeat,
+            'delay': args.delay,
+            'route_repeat': args.route_repeat,
+        },
+    }
+    recorder = Recorder(args.repeat)
+    with tempfile.TemporaryDirectory() as work_dir:
+        feed_dir = os.path.join(work_dir, 'feeds')
+        league = recorder.time('generate', lambda: write_feeds(feed_dir, args.players, args.games, args.seasons),
+                               repeat=1)
+        results['meta']['player_games'] = league['games']
+        with FeedServer(feed_dir) as base_url:
+            data_dir, player_ids = bench_pipeline(recorder, base_url, work_dir, args.workers)
+            bench_build(recorder, base_url, work_dir, args.workers)
+        if args.delay > 0:
+            bench_fetch_latency(recorder, feed_dir, player_ids[:args.latency_players], args.workers, args.delay)
+        bench_app(recorder, data_dir, player_ids, args.route_repeat)
+    results['stages'] = recorder.stages
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            compare_results(results, json.load(f), args.threshold)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Compare the per-game scorer in combine.py with the vectorized NumPy engine.
+
+Generates a synthetic league with synthetic_league.py, checks that both produce identical
+season and weekly totals, and reports the best of several timings for each.
+
+    python benchmarks/scoring_benchmark.py [--players 800] [--games 34] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import combine
+import scoring_engine
+from synthetic_league import make_league
+
+def with_null_stats(all_game_stats, share=0.05, seed=0):
+    """Return a copy of the league's games with a share of the stats reported as null, as the feed sometimes does."""
+    rng = random.Random(seed)
+    return {
+        player_id: [
+            {'match_id': game['match_id'],
+             'stats': {code: None if rng.random() < share else value for code, value in game['stats'].items()}}
+            for game in games
+        ]
+        for player_id, games in all_game_stats.items()
+    }
+
+def score_per_game(player_index, all_game_stats, week_of):
+    """Score every player with calculate_point_totals and aggregate_weekly_stats."""
+    results = {}
+    for player_id, game_stats in all_game_stats.items():
+        fantasy_stats = player_index[player_id]
+        results[player_id] = {
+            'point_totals': combine.calculate_point_totals(game_stats, fantasy_stats) if game_stats else None,
+            'counts': combine.scoring_rules.count_totals(game_stats),
+            'weeks': combine.aggregate_weekly_stats(game_stats, fantasy_stats, week_of),
+        }
+    return results
+
+def score_vectorized(player_index, all_game_stats, week_of):
+    return scoring_engine.score_league(list(all_game_stats), all_game_stats, player_index, week_of)
+
+def assert_same_results(expected, actual):
+    """Check season totals, counts and weekly points/games match; weekly raw stats must agree where present."""
+    assert expected.keys() == actual.keys()
+    for player_id, result in expected.items():
+        other = actual[player_id]
+        assert result['point_totals'] == other['point_totals'], player_id
+        assert result['counts'] == other['counts'], player_id
+        assert result['weeks'].keys() == other['weeks'].keys(), player_id
+        for week, week_totals in result['weeks'].items():
+            other_week = other['weeks'][week]
+            assert week_totals['games'] == other_week['games'], (player_id, week)
+            assert week_totals['total_points'] == other_week['total_points'], (player_id, week)
+            for stat in scoring_engine.STAT_CODES:
+                assert other_week['stats'].get(stat, 0) == week_totals['stats'].get(stat, 0), (player_id, week, stat)
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=800)
+    parser.add_argument('--games', type=int, default=34)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    player_index, all_game_stats, calendar = make_league(args.players, args.games)
+    week_of = calendar.week_of
+    total_games = sum(len(games) for games in all_game_stats.values())
+    print(f"Synthetic league: {args.players} players, {total_games} games")
+
+    assert_same_results(score_per_game(player_index, all_game_stats, week_of),
+                        score_vectorized(player_index, all_game_stats, week_of))
+    null_game_stats = with_null_stats(all_game_stats)
+    assert_same_results(score_per_game(player_index, null_game_stats, week_of),
+                        score_vectorized(player_index, null_game_stats, week_of))
+    print("Results match (including null stats)")
+
+    per_game = best_time(lambda: score_per_game(player_index, all_game_stats, week_of), args.repeat)
+    vectorized = best_time(lambda: score_vectorized(player_index, all_game_stats, week_of), args.repeat)
+    print(f"Per-game scoring:   {per_game * 1000:8.1f} ms")
+    print(f"Vectorized scoring: {vectorized * 1000:8.1f} ms ({per_game / vectorized:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""
+Synthetic MLS fantasy feeds for benchmarks, plus a local stand-in for the feed server.
+
+Writes squads.json, players.json, rounds.json and stats/players/<id>.json in the layout
+combine.py fetches from DATA_BASE_URL, at any scale: every team plays one match per round,
+and each player appears in a share of their team's matches for as many seasons as requested.
+The fixtures (rounds.json) cover the latest season, as the real feed does.
+With --data-dir it also scores the league into the files the app reads (DATA_DIR).
+
+    python benchmarks/synthetic_league.py feeds/ [--players 800] [--games 34] [--seasons 1]
+"""
+import argparse
+import http.server
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import combine
+import columnar  # from app/, which combine.py puts on sys.path
+from fixtures import RoundCalendar
+
+NUM_TEAMS = 30
+# Upper bound for each raw stat in a synthetic game
+STAT_RANGES = {
+    'MIN': 95, 'GL': 2, 'ASS': 2, 'GC': 4, 'CS': 1, 'GS': 8, 'PS': 1, 'PM': 1, 'YC': 1,
+    'RC': 1, 'OG': 1, 'SGS': 6, 'FS': 6, 'PSS': 80, 'CRS': 7, 'KP': 6, 'CL': 9, 'WF': 6
+}
+
+def season_start(season):
+    return date(2025 + season, 2, 22)
+
+def team_schedule(num_games, seasons, rng):
+    """Return {team_id: [match_id, ...]}: one match per team per round, Saturdays to Mondays."""
+    schedule = {team_id: [] for team_id in range(1, NUM_TEAMS + 1)}
+    for season in range(seasons):
+        for game in range(num_games):
+            for team_id in schedule:
+                match_day = season_start(season) + timedelta(days=7 * game + rng.randint(0, 2))
+                schedule[team_id].append(int(match_day.strftime('%Y%m%d')))
+    return schedule
+
+def season_rounds(num_games, season):
+    """Return the rounds.json entries of a season: one round per week, Saturday to Monday."""
+    rounds = []
+    for game in range(num_games):
+        start = season_start(season) + timedelta(days=7 * game)
+        rounds.append({
+            'id': game + 1,
+            'status': 'complete',
+            'start': f"{start.isoformat()}T00:00:00+00:00",
+            'end': f"{(start + timedelta(days=2)).isoformat()}T23:59:59+00:00",
+        })
+    return rounds
+
+def make_feeds(num_players, num_games, seasons=1, seed=0):
+    """Return (squads, players, rounds, {player_id: stats payload}) in the shapes of the real feeds."""
+    rng = random.Random(seed)
+    squads = [
+        {'id': team_id, 'name': f"Team {team_id}", 'short_name': f"T{team_id:02d}"}
+        for team_id in range(1, NUM_TEAMS + 1)
+    ]
+    schedule = team_schedule(num_games, seasons, rng)
+
+    players = []
+    payloads = {}
+    for player_id in range(1000, 1000 + num_players):
+        squad_id = rng.randint(1, NUM_TEAMS)
+        position = rng.randint(1, 4)
+        appearance_rate = rng.random()
+        payload = []
+        for match_id in schedule[squad_id]:
+            if rng.random() >= appearance_rate:
+                continue
+            stats = {code: rng.randint(0, high) for code, high in STAT_RANGES.items() if rng.random() < 0.8}
+            payload.append({'match_id': match_id, 'stats': stats})
+        payloads[player_id] = payload
+
+        total_points = rng.randint(0, 200)
+        players.append({
+            'id': player_id,
+            'first_name': f"F{player_id}",
+            'last_name': f"L{player_id}",
+            'positions': [position],
+            'squad_id': squad_id,
+            'cost': rng.randint(25, 130) * 100_000,
+            'stats': {
+                'games_played': len(payload),
+                'total_points': total_points,
+                'avg_points': round(total_points / len(payload), 2) if payload else 0,
+                'owned_by': round(rng.random() * 40, 2),
+                'high_score': rng.randint(0, 25),
+                'low_score': rng.randint(-3, 2),
+            },
+        })
+    return squads, players, season_rounds(num_games, seasons - 1), payloads
+
+def make_league(num_players, num_games, seasons=1, seed=0):
+    """
+    Return (player_index, all_game_stats, calendar) for a synthetic league: the feeds of
+    make_feeds normalized and parsed as combine.py does, with the round calendar.
+    """
+    squads, players, rounds, payloads = make_feeds(num_players, num_games, seasons, seed)
+    player_index = combine.build_player_index(players, {team['id']: team for team in squads})
+    all_game_stats = {player_id: combine.parse_game_stats(payloads[player_id]) for player_id in player_index}
+    return player_index, all_game_stats, RoundCalendar.from_feed(rounds)
+
+def write_json(path, obj):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f)
+
+def write_feeds(feed_dir, num_players, num_games, seasons=1, seed=0):
+    """
+    Write a synthetic league to feed_dir in the feed server's layout.
+    Returns {'players': number of players, 'games': number of player games}.
+    """
+    squads, players, rounds, payloads = make_feeds(num_players, num_games, seasons, seed)
+    os.makedirs(os.path.join(feed_dir, 'stats', 'players'), exist_ok=True)
+    write_json(os.path.join(feed_dir, 'squads.json'), squads)
+    write_json(os.path.join(feed_dir, 'players.json'), players)
+    write_json(os.path.join(feed_dir, 'rounds.json'), rounds)
+    for player_id, payload in payloads.items():
+        write_json(os.path.join(feed_dir, 'stats', 'players', f"{player_id}.json"), payload)
+    return {'players': len(players), 'games': sum(len(payload) for payload in payloads.values())}
+
+def write_dataset(data_dir, num_players, num_games, seasons=1, seed=0):
+    """
+    Score a synthetic league straight into the app's data files: player_stats.csv,
+    player_stats.bin and weekly_data/ under data_dir. Returns the player IDs.
+    """
+    player_index, all_game_stats, calendar = make_league(num_players, num_games, seasons, seed)
+    players_state = combine.score_players(all_game_stats, player_index, calendar.week_of)
+
+    season_rows = [
+        combine.format_season_row(player_index[player_id], entry['point_totals'], entry['counts'])
+        for player_id, entry in players_state.items() if entry['point_totals'] is not None
+    ]
+    weekly_data = {}
+    for player_id, entry in players_state.items():
+        for week, week_totals in entry['weeks'].items():
+            weekly_data.setdefault(week, {})[player_id] = week_totals
+
+    os.makedirs(data_dir, exist_ok=True)
+    combine.export_to_csv(season_rows, os.path.join(data_dir, 'player_stats.csv'))
+    columnar.write_table(os.path.join(data_dir, 'player_stats.bin'), season_rows)
+    combine.write_weekly_files(weekly_data, player_index, weekly_dir=os.path.join(data_dir, 'weekly_data'))
+    return list(player_index)
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler (query strings ignored, Last-Modified/304 supported) without access logs."""
+    protocol_version = 'HTTP/1.1'  # keep-alive, as the real feed host allows
+    disable_nagle_algorithm = True  # headers and body go out separately; don't wait on delayed ACKs
+
+    def __init__(self, *args, delay=0, **kwargs):
+        self.delay = delay  # set first: the base class handles the request in __init__
+        super().__init__(*args, **kwargs)
+
+    def send_head(self):
+        # Stand in for the network and the feed host's own response time
+        if self.delay:
+            time.sleep(self.delay)
+        return super().send_head()
+
+    def log_message(self, format, *args):
+        pass
+
+class FeedServer:
+    """
+    Serve a feed directory over HTTP on localhost in a background thread:
+
+        with FeedServer(feed_dir) as base_url:
+            combine.main(['--base-url', base_url])
+
+    delay adds that many seconds to every response, as a remote feed host would.
+    """
+
+    def __init__(self, feed_dir, port=0, delay=0):
+        handler = lambda *args, **kwargs: QuietHandler(*args, directory=feed_dir, delay=delay, **kwargs)
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self.base_url
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('feed_dir')
+    parser.add_argument('--players', type=int, default=800)
+    parser.add_argument('--games', type=int, default=34, help="rounds per season")
+    parser.add_argument('--seasons', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help="also write the scored CSVs the app reads here")
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help="serve the feeds on this port afterwards, for combine.py --base-url")
+    parser.add_argument('--delay', type=float, default=0,
+                        help="seconds of latency added to every response when serving")
+    args = parser.parse_args()
+
+    league = write_feeds(args.feed_dir, args.players, args.games, args.seasons, args.seed)
+    print(f"Wrote {league['players']} players ({league['games']} games over {args.games} rounds"
+          f" x {args.seasons} seasons) to {args.feed_dir}")
+    if args.data_dir:
+        write_dataset(args.data_dir, args.players, args.games, args.seasons, args.seed)
+    if args.serve is not None:
+        with FeedServer(args.feed_dir, args.serve, args.delay) as base_url:
+            print(f"Serving on {base_url} (Ctrl+C to stop)")
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
+
+if __name__ == '__main__':
+    main()
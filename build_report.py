@@ -0,0 +1,156 @@
+"""
+Lightweight run instrumentation for combine.py.
+
+A BuildReport collects nested timing spans for the build stages, a latency histogram and
+byte and cache counters for the feed requests (safe to update from the fetch threads) and
+the rows written to each output file, and is saved as JSON next to the CSVs so a slow or
+failed build can be diagnosed after the fact.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+
+# Upper bounds (ms) of the fetch latency histogram buckets; slower requests go in a last bucket
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class Histogram:
+    """Counts of values per bucket, with their count, sum and maximum."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile (the maximum for the last bucket)."""
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'max': self.max,
+            'buckets': {**{f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)},
+                        'inf': self.counts[-1]},
+        }
+
+class Span:
+    """One timed stage, with the stages nested inside it."""
+    __slots__ = ('name', 'start', 'seconds', 'children', 'details')
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.seconds = None
+        self.children = []
+        self.details = {}
+
+    def to_dict(self, origin):
+        span = {'name': self.name, 'start': round(self.start - origin, 6), 'seconds': self.seconds}
+        if self.details:
+            span.update(self.details)
+        if self.children:
+            span['children'] = [child.to_dict(origin) for child in self.children]
+        return span
+
+class BuildReport:
+    """Spans, fetch statistics and output counts for one run of combine.main."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._origin = time.perf_counter()
+        self._root = Span('build', self._origin)
+        self._stack = [self._root]
+        self.fetch_latency = Histogram()
+        self.fetch = {'requests': 0, 'errors': 0, 'bytes': 0}
+        self.cache = {'hits': 0, 'misses': 0, 'uncached': 0}
+        self.outputs = {}
+        self.info = {}
+
+    @contextmanager
+    def span(self, name, **details):
+        """
+        Time a stage of the build (from the main thread), nested in the enclosing span.
+        Extra details, given here or set on the yielded span, are saved with it.
+        """
+        span = Span(name, time.perf_counter())
+        span.details.update(details)
+        self._stack[-1].children.append(span)
+        self._stack.append(span)
+        try:
+            yield span
+        finally:
+            span.seconds = round(time.perf_counter() - span.start, 6)
+            self._stack.pop()
+            if len(self._stack) == 1:
+                print(f"[{name}] {span.seconds:.2f}s")
+
+    def record_fetch(self, seconds, cache_result, size=0, error=False):
+        """
+        Count one feed request: its latency (None for offline reads), how it used the cache
+        ('hits' for a 304 or an offline read, 'misses' for a download into the cache or a
+        missing offline copy, 'uncached' without a cache) and the bytes downloaded.
+        """
+        with self._lock:
+            self.fetch['requests'] += 1
+            self.fetch['bytes'] += size
+            if error:
+                self.fetch['errors'] += 1
+            if cache_result:
+                self.cache[cache_result] += 1
+            if seconds is not None:
+                self.fetch_latency.add(seconds * 1000)
+
+    def record_output(self, path, rows):
+        """Count the rows written to an output file."""
+        with self._lock:
+            self.outputs[path] = {'rows': rows, 'bytes': os.path.getsize(path) if os.path.exists(path) else 0}
+
+    def to_dict(self):
+        self._root.seconds = round(time.perf_counter() - self._origin, 6)
+        lookups = self.cache['hits'] + self.cache['misses']
+        return {
+            'started_at': self.started_at,
+            'seconds': self._root.seconds,
+            **self.info,
+            'stages': [child.to_dict(self._origin) for child in self._root.children],
+            'fetch': {
+                **self.fetch,
+                'latency_ms': self.fetch_latency.to_dict(),
+                'cache': {**self.cache, 'hit_rate': self.cache['hits'] / lookups if lookups else None},
+            },
+            'outputs': self.outputs,
+        }
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+report = BuildReport()
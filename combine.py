@@ -1,299 +1,306 @@
 import requests
-import math
 import csv
 import os
+import sys
+import argparse
+import json
+import threading
+import hashlib
+import time
+import cProfile
+from urllib.parse import urlsplit
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 
-def fetch_all_team_data():
-    """Fetch all team data from the S3 bucket once and store it."""
-    url = "https://fgp-data-us.s3.us-east-1.amazonaws.com/json/mls_mls/squads.json?_=1741969652364"
+# Modules shared with the Flask app live in app/ and are imported the same way the app does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+import columnar
+import scoring_rules
+from build_report import report
+from fixtures import FIXTURES_FEED, RoundCalendar, StaticCalendar
+
+try:
+    import scoring_engine
+except ImportError:  # NumPy is optional; without it players are scored one game at a time
+    scoring_engine = None
+
+# Base URL of the fantasy data feeds; override to point at a local mirror or test server
+DATA_BASE_URL = os.environ.get('MLS_DATA_BASE_URL', "https://fgp-data-us.s3.us-east-1.amazonaws.com/json/mls_mls")
+FETCH_WORKERS = 16  # concurrent requests when fetching per-player game stats
+FETCH_TIMEOUT = 10  # seconds per request
+FEED_CACHE_DIR = '.feed_cache'  # raw responses and their validators, reused across runs
+WEEKLY_DATA_DIR = os.path.join('app', 'weekly_data')
+BUILD_STATE_FILE = 'build_state.json'  # per-player match IDs and aggregates from the last build
+BUILD_REPORT_FILE = 'build_report.json'  # timings, fetch statistics and outputs of the last run
+# Bump when scoring or week assignment changes so that state from older builds is discarded
+BUILD_STATE_VERSION = 3
+
+def create_session(pool_size=FETCH_WORKERS):
+    """Create a requests session that keeps up to pool_size connections alive."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def cache_paths(cache_dir, url):
+    """Return the (body, metadata) file paths used to cache a feed URL."""
+    # The query string is only a cache-buster, so the URL path identifies the resource
+    path = urlsplit(url).path.lstrip('/')
+    body_path = os.path.join(cache_dir, *path.split('/'))
+    return body_path, body_path + '.meta.json'
+
+def read_cached_body(cache_dir, url):
+    """Return the cached body for a URL, or None if it has not been cached."""
+    body_path, _ = cache_paths(cache_dir, url)
+    try:
+        with open(body_path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def read_cached_meta(cache_dir, url):
+    """Return the cached validators (ETag / Last-Modified) for a URL."""
+    _, meta_path = cache_paths(cache_dir, url)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def write_cache(cache_dir, url, body, response):
+    """Store a response body and its validators, replacing any previous copy atomically."""
+    body_path, meta_path = cache_paths(cache_dir, url)
+    os.makedirs(os.path.dirname(body_path), exist_ok=True)
+    meta = {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'fetched_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    for path, data, mode in ((body_path, body, 'wb'), (meta_path, json.dumps(meta), 'w')):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+def fetch_json(url, description, session=None, timeout=FETCH_TIMEOUT, cache_dir=None, offline=False,
+               conditional=True):
+    """
+    Fetch and decode a JSON feed, returning None on failure.
+    With a cache_dir the request is made conditional on the cached ETag / Last-Modified
+    validators and a 304 reuses the cached body. In offline mode only the cache is read.
+    """
+    if offline:
+        body = read_cached_body(cache_dir, url) if cache_dir else None
+        report.record_fetch(None, 'hits' if body is not None else 'misses', error=body is None)
+        if body is None:
+            print(f"No cached copy of {description} available offline")
+            return None
+        return json.loads(body)
+    
+    headers = {}
+    if conditional and cache_dir and os.path.exists(cache_paths(cache_dir, url)[0]):
+        meta = read_cached_meta(cache_dir, url)
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+    
+    start = time.perf_counter()
+    try:
+        response = (session or requests).get(url, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        report.record_fetch(time.perf_counter() - start, None, error=True)
+        print(f"Failed to fetch {description}: {e}")
+        return None
+    elapsed = time.perf_counter() - start
+    
+    if response.status_code == 304 and cache_dir:
+        body = read_cached_body(cache_dir, url)
+        if body is None:
+            # The body was removed after the request was sent; its validators alone are no use
+            print(f"Cached copy of {description} is missing, fetching it in full")
+            return fetch_json(url, description, session, timeout, cache_dir, offline, conditional=False)
+        report.record_fetch(elapsed, 'hits')
+        return json.loads(body)
     
-    response = requests.get(url)
     if response.status_code == 200:
-        teams = response.json()
-        
-        # Create a dictionary mapping team IDs to their data
-        team_dict = {team['id']: team for team in teams}
-        
-        # Print the fetched team data for testing
-       # for team_id, team_info in team_dict.items():
-           # print(f"Team ID: {team_id}, Name: {team_info['name']}, Short Name: {team_info['short_name']}")
-        
-        return team_dict
+        report.record_fetch(elapsed, 'misses' if cache_dir else 'uncached', len(response.content))
+        if cache_dir:
+            write_cache(cache_dir, url, response.content, response)
+        return response.json()
     else:
-        print(f"Failed to fetch team data, status code: {response.status_code}")
+        report.record_fetch(elapsed, None, error=True)
+        print(f"Failed to fetch {description}, status code: {response.status_code}")
+        return None
+
+def fetch_all_team_data(session=None, base_url=DATA_BASE_URL, timeout=FETCH_TIMEOUT, cache_dir=None, offline=False):
+    """Fetch all team data from the S3 bucket once and store it."""
+    url = f"{base_url}/squads.json?_=1741969652364"
+    
+    teams = fetch_json(url, "team data", session, timeout, cache_dir, offline)
+    if teams is None:
         return {}
+    
+    # Create a dictionary mapping team IDs to their data
+    team_dict = {team['id']: team for team in teams}
+    
+    # Print the fetched team data for testing
+   # for team_id, team_info in team_dict.items():
+       # print(f"Team ID: {team_id}, Name: {team_info['name']}, Short Name: {team_info['short_name']}")
+    
+    return team_dict
 
-def fetch_all_player_data():
+def fetch_all_player_data(session=None, base_url=DATA_BASE_URL, timeout=FETCH_TIMEOUT, cache_dir=None, offline=False):
     """Fetch all player data from the S3 bucket once and store it."""
-    url = "https://fgp-data-us.s3.us-east-1.amazonaws.com/json/mls_mls/players.json?_=1741793495420"
+    url = f"{base_url}/players.json?_=1741793495420"
     
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Failed to fetch player data, status code: {response.status_code}")
-        return []
+    players = fetch_json(url, "player data", session, timeout, cache_dir, offline)
+    return players if players is not None else []
 
-def fetch_all_game_stats(player_ids):
-    """Fetch game stats for all players and store them in a dictionary."""
-    player_game_stats = {}
+def fetch_round_calendar(session=None, base_url=DATA_BASE_URL, timeout=FETCH_TIMEOUT, cache_dir=None, offline=False,
+                         fixtures_file=None):
+    """
+    Build the round calendar from the fixtures feed, or from fixtures_file when given.
+    If the feed cannot be fetched, the last cached copy is used. Returns None without either.
+    """
+    if fixtures_file:
+        with open(fixtures_file, encoding='utf-8') as f:
+            return RoundCalendar.from_feed(json.load(f))
     
-    for player_id in player_ids:
-        url = f"https://fgp-data-us.s3.us-east-1.amazonaws.com/json/mls_mls/stats/players/{player_id}.json?_=1741793495420"
-        response = requests.get(url)
-        
-        if response.status_code == 200:
-            player_data = response.json()
-            
-            game_stats = []
-            for player in player_data:
-                match_stats = player.get('stats', {})
-                match_id = player.get('match_id', None)
-                if match_id:
-                    game_stats.append({'match_id': match_id, 'stats': match_stats})
-            
-            player_game_stats[player_id] = game_stats
-        else:
-            print(f"Failed to fetch game stats for player {player_id}, status code: {response.status_code}")
-            player_game_stats[player_id] = []
+    url = f"{base_url}/{FIXTURES_FEED}"
+    rounds = fetch_json(url, "fixtures", session, timeout, cache_dir, offline)
+    if rounds is None and cache_dir and not offline:
+        body = read_cached_body(cache_dir, url)
+        if body is not None:
+            print("Using the cached fixtures")
+            rounds = json.loads(body)
+    return RoundCalendar.from_feed(rounds) if rounds else None
+
+def parse_game_stats(player_data):
+    """Reduce a raw per-player stats payload to a list of {'match_id', 'stats'} entries."""
+    game_stats = []
+    for player in player_data:
+        match_stats = player.get('stats', {})
+        match_id = player.get('match_id', None)
+        if match_id:
+            game_stats.append({'match_id': match_id, 'stats': match_stats})
+    return game_stats
+
+def fetch_player_game_stats(session, player_id, base_url=DATA_BASE_URL, timeout=FETCH_TIMEOUT,
+                            cache_dir=None, offline=False):
+    """Fetch and parse the game stats for a single player, returning None on failure."""
+    url = f"{base_url}/stats/players/{player_id}.json?_=1741793495420"
+    player_data = fetch_json(url, f"game stats for player {player_id}", session, timeout, cache_dir, offline)
+    return parse_game_stats(player_data) if player_data is not None else None
+
+def fetch_all_game_stats(player_ids, max_workers=FETCH_WORKERS, timeout=FETCH_TIMEOUT,
+                         base_url=DATA_BASE_URL, session=None, cache_dir=None, offline=False, failed=None):
+    """
+    Fetch game stats for all players and store them in a dictionary.
+    Requests run on a pool of max_workers threads sharing one keep-alive session.
+    Players whose stats could not be fetched get an empty list and are added to failed, if given.
+    """
+    owns_session = session is None and not offline
+    if owns_session:
+        session = create_session(max_workers)
+    
+    fetched = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(fetch_player_game_stats, session, player_id, base_url, timeout,
+                                cache_dir, offline): player_id
+                for player_id in player_ids
+            }
+            for future in as_completed(futures):
+                player_id = futures[future]
+                game_stats = future.result()
+                if game_stats is None:
+                    game_stats = []
+                    if failed is not None:
+                        failed.add(player_id)
+                fetched[player_id] = game_stats
+    finally:
+        if owns_session:
+            session.close()
     
+    # Keep the same ordering as player_ids
+    player_game_stats = {player_id: fetched[player_id] for player_id in player_ids}
     return player_game_stats
 
-def determine_week_from_match_id(match_id):
-    """Determine the week/round from match_id using chronological ordering."""
-    try:
-        # Match IDs are in YYYYMMDD format
-        match_num = int(match_id)
-        
-        # Define rough chronological ranges for MLS weeks based on match IDs
-        # This is based on the observation that matches start around 20250104
-        if match_num >= 20250000:  # 2025 season dates
-            # Map date ranges to weeks more accurately
-            if match_num <= 20250115:  # Early January
-                week_num = 1
-            elif match_num <= 20250215:  # Mid January to mid February
-                week_num = 2
-            elif match_num <= 20250315:  # Mid February to mid March  
-                week_num = 3
-            elif match_num <= 20250415:  # Mid March to mid April
-                week_num = 4
-            elif match_num <= 20250515:  # Mid April to mid May
-                week_num = 5
-            elif match_num <= 20250615:  # Mid May to mid June
-                week_num = 6
-            elif match_num <= 20250715:  # Mid June to mid July
-                week_num = 7
-            elif match_num <= 20250815:  # Mid July to mid August
-                week_num = 8
-            elif match_num <= 20250915:  # Mid August to mid September
-                week_num = 9
-            elif match_num <= 20251015:  # Mid September to mid October
-                week_num = 10
-            elif match_num <= 20251115:  # Mid October to mid November
-                week_num = 11
-            elif match_num <= 20251215:  # Mid November to mid December
-                week_num = 12
-            else:
-                # Later dates spread across remaining weeks
-                week_num = min(28, max(13, ((match_num - 20251215) // 100) + 13))
-        else:
-            # Fallback for non-date match IDs
-            week_num = (match_num % 28) + 1
-        
-        week_num = max(1, min(28, week_num))
-        return f"Week {week_num}"
-    except:
-        return "Week 14"  # Default fallback
-
-def extract_fantasy_stats(player_data, player_id):
-    """Extract fantasy stats for a specific player from the already downloaded data."""
-    position_mapping = {1: 'Goalkeeper', 2: 'Defender', 3: 'Midfielder', 4: 'Forward'}
+POSITION_MAPPING = {1: 'Goalkeeper', 2: 'Defender', 3: 'Midfielder', 4: 'Forward'}
+
+def normalize_player(player, team_dict):
+    """Turn a raw players.json entry into a fantasy stats record with display fields resolved."""
+    positions = [POSITION_MAPPING.get(pos, 'Unknown') for pos in player.get('positions', [])]
+    stats = player.get('stats', {})
+    squad_id = player.get('squad_id', 0)
+    cost = player.get('cost', 0)
+    return {
+        'id': player['id'],
+        'first_name': player.get('first_name', ''),
+        'last_name': player.get('last_name', ''),
+        'name': f"{player.get('first_name', '')} {player.get('last_name', '')}",
+        'cost': cost,
+        'cost_display': f"${cost / 1_000_000:.1f}M",  # Format as million with one decimal place
+        'total_points': stats.get('total_points', 0),
+        'avg_points': stats.get('avg_points', 0),
+        'owned_by': stats.get('owned_by', 0),
+        'high_score': stats.get('high_score', 0),
+        'low_score': stats.get('low_score', 0),
+        'positions': positions,
+        'positions_display': ', '.join(positions),
+        'squad_id': squad_id,
+        'team': team_dict.get(squad_id, {}).get('name', 'Unknown Team'),
+    }
+
+def build_player_index(player_data, team_dict):
+    """
+    Normalize the raw players payload once into {player_id: fantasy stats record}.
+    Downstream stages look players up here instead of scanning player_data.
+    """
+    player_index = {}
     for player in player_data:
-        if player.get('id') == player_id:
-            positions = [position_mapping.get(pos, 'Unknown') for pos in player.get('positions', [])]
-            return {
-                'id': player['id'],
-                'first_name': player.get('first_name', ''),
-                'last_name': player.get('last_name', ''),
-                'cost': player.get('cost', 0),
-                'total_points': player.get('stats', {}).get('total_points', 0),
-                'avg_points': player.get('stats', {}).get('avg_points', 0),
-                'owned_by': player.get('stats', {}).get('owned_by', 0),
-                'high_score': player.get('stats', {}).get('high_score', 0),
-                'low_score': player.get('stats', {}).get('low_score', 0),
-                'positions': positions,
-                'squad_id': player.get('squad_id', 0)  # Add squad_id here
-            }
-    return {}
+        # Keep the first entry if an ID is listed twice, as a linear scan would
+        if player.get('id') not in player_index:
+            player_index[player['id']] = normalize_player(player, team_dict)
+    return player_index
+
+def extract_fantasy_stats(player_index, player_id):
+    """Look up the fantasy stats record for a specific player in the prebuilt index."""
+    return player_index.get(player_id, {})
 
-def calculate_player_points(game_stats, fantasy_stats, team_dict):
+def calculate_player_points(game_stats, fantasy_stats):
     """Calculate fantasy points for a player based on game statistics."""
-    # MLSF GUI - S3 (GF - GL)
-    total_min_points = 0 # MIN total minutes player
-    total_gl_points = 0  # goals: GF - GL 
-    total_ass_points = 0 # assists: A - ASS
-    total_gc_points = 0  # goals conceded: GA - GC
-    total_cs_points = 0  # clean sheet: CS - CS
-    total_gs_points = 0  # goalkeeper saves: GS - GS
-    total_ps_points = 0  # penalty save: PS - PS
-    total_pm_points = 0  # penalty miss: PM - PM
-    total_yc_points = 0  # yellow card: Y - YC
-    total_rc_points = 0  # red card: R - RC
-    total_og_points = 0  # own goals: OG - OG
-    total_sgs_points = 0 # shots at goal: SGS - SGS
-    total_fs_points = 0  # fouls received: FS - FS
-    total_pss_points = 0 # pass: P - PSS
-    total_crs_points = 0 # crosses: CRS - CRS
-    total_kp_points = 0  # key pass: KP - KP
-    total_cl_points = 0  # clearance: CL - CL
-    total_wf_points = 0  # Fouls against: WF - WF
-
-    # Check player positions once from fantasy_stats
-    is_defender = 'Defender' in fantasy_stats['positions']
-    is_goalkeeper = 'Goalkeeper' in fantasy_stats['positions']
-    is_midfielder = 'Midfielder' in fantasy_stats['positions']
-    is_defender_or_goalkeeper = is_defender or is_goalkeeper
+    point_totals = calculate_point_totals(game_stats, fantasy_stats)
+    return format_season_row(fantasy_stats, point_totals, scoring_rules.count_totals(game_stats))
 
-    for game in game_stats:
-        goals_conceded = game['stats'].get('GC', 0)
-        min_played = game['stats'].get('MIN', 0)
-        
-        # Minutes played points
-        if min_played <= 60:
-            min_points = 1  # 1 point for playing up to 60 minutes
-        else:
-            min_points = 2  # 2 points for playing over 60 minutes
-            
-        # Goal points
-        gl_points = game['stats'].get('GL', 0)
-        if is_defender_or_goalkeeper:
-            gl_points = gl_points * 6  # 6 points for defenders/goalkeepers
-        else:
-            gl_points = gl_points * 5  # 5 points for others
-            
-        # Goals conceded (for defenders and goalkeepers only)
-        if is_defender_or_goalkeeper:
-            gc_points = math.floor(game['stats'].get('GC', 0) / 2) * -1
-        else:
-            gc_points = 0
-        
-        # Clean sheet points (60+ minutes and no goals conceded)
-        if min_played >= 60 and goals_conceded == 0:
-            if is_defender_or_goalkeeper:
-                cs_points = 5  # 5 points for defenders or goalkeepers with a clean sheet
-            elif is_midfielder:
-                cs_points = 1  # 1 point for midfielders with a clean sheet
-            else:
-                cs_points = 0  # No points for other positions
-        else:
-            cs_points = 0
-            
-        # Goalkeeper specific points
-        if is_goalkeeper:
-            gs_points = math.floor(game['stats'].get('GS', 0) // 4 ) # Every 4 saves = 1 point
-            ps_points = math.floor(game['stats'].get('PS', 0) * 5)  # 5 points for every penalty save
-        else:
-            gs_points = 0
-            ps_points = 0
-            
-        # Other stats points
-        pm_points = math.floor(game['stats'].get('PM', 0) * -2)
-        og_points = math.floor(game['stats'].get('OG', 0) * -2)
-        sgs_points = math.floor(game['stats'].get('SGS', 0) // 4)
-        fs_points = math.floor(game['stats'].get('FS', 0) // 4)
-        # passes are supposed to be only if 84% accuracy but we don't have that stat
-        pss_points = math.floor(game['stats'].get('PSS', 0) // 35)
-        crs_points = math.floor(game['stats'].get('CRS', 0) // 3)
-        kp_points = math.floor(game['stats'].get('KP', 0) // 4)
-        cl_points = math.floor(game['stats'].get('CL', 0) // 4)
-        wf_points = math.floor(game['stats'].get('WF', 0) // 4 * -1)
-        ass_points = math.floor(game['stats'].get('ASS', 0) * 3)
-        yc_points = math.floor(game['stats'].get('YC', 0) * -1)
-        rc_points = math.floor(game['stats'].get('RC', 0) * -3)
-
-        # Accumulate totals
-        total_min_points += min_points
-        total_gl_points += gl_points
-        total_ass_points += ass_points
-        total_yc_points += yc_points
-        total_rc_points += rc_points
-        total_gc_points += gc_points
-        total_cs_points += cs_points
-        total_gs_points += gs_points
-        total_ps_points += ps_points
-        total_pm_points += pm_points
-        total_og_points += og_points
-        total_sgs_points += sgs_points
-        total_fs_points += fs_points
-        total_pss_points += pss_points
-        total_crs_points += crs_points
-        total_kp_points += kp_points
-        total_cl_points += cl_points
-        total_wf_points += wf_points
-
-    # Calculate total points
-    total_points = (
-        total_min_points +
-        total_gl_points + 
-        total_ass_points + 
-        total_yc_points + 
-        total_rc_points + 
-        total_gc_points +
-        total_cs_points + 
-        total_gs_points + 
-        total_ps_points + 
-        total_pm_points + 
-        total_og_points +
-        total_sgs_points + 
-        total_fs_points + 
-        total_pss_points + 
-        total_crs_points +
-        total_kp_points + 
-        total_cl_points + 
-        total_wf_points
-    )
-    
-    # At the end, add the Team Name to your return dictionary:
-    squad_id = fantasy_stats.get('squad_id', 0)
-    team_name = team_dict.get(squad_id, {}).get('name', 'Unknown Team')
+def calculate_point_totals(game_stats, fantasy_stats):
+    """Calculate the per-stat season point totals for a player, keyed by CSV column."""
+    return scoring_rules.point_totals(game_stats, fantasy_stats['positions'])
 
+def format_season_row(fantasy_stats, point_totals, count_totals):
+    """Build a player_stats.csv row from fantasy stats, calculated point totals and actual counts."""
     # Prepare data for CSV export
-    return {
+    row = {
         'Player ID': fantasy_stats['id'],
-        'Name': f"{fantasy_stats['first_name']} {fantasy_stats['last_name']}",
-        'Team': team_name,  # Add team name here
-        'Cost': f"${fantasy_stats['cost'] / 1_000_000:.1f}M",  # Format as million with one decimal place
+        'Name': fantasy_stats['name'],
+        'Team': fantasy_stats['team'],
+        'Cost': fantasy_stats['cost_display'],
         'Total Points': fantasy_stats['total_points'],
         'Average Points': fantasy_stats['avg_points'],
         'Owned By': f"{fantasy_stats['owned_by']:.2f}%",
         'High Score': fantasy_stats['high_score'],
         'Low Score': fantasy_stats['low_score'],
-        'Positions': ', '.join(map(str, fantasy_stats['positions'])),
-        'Total MIN Points': total_min_points,
-        'Total GL Points': total_gl_points,
-        'Total ASS Points': total_ass_points,
-        'Total YC Points': total_yc_points,
-        'Total RC Points': total_rc_points,
-        'Total GC Points': total_gc_points,
-        'Total CS Points': total_cs_points,
-        'Total GS Points': total_gs_points,
-        'Total PS Points': total_ps_points,
-        'Total PM Points': total_pm_points,
-        'Total OG Points': total_og_points,
-        'Total SGS Points': total_sgs_points,
-        'Total FS Points': total_fs_points,
-        'Total PSS Points': total_pss_points,
-        #'Total APS Points': total_aps_points,
-        'Total CRS Points': total_crs_points,
-        'Total KP Points': total_kp_points,
-       # 'Total ASG Points': total_asg_points,
-        #'Total SH Points': total_sh_points,
-        'Total CL Points': total_cl_points,
-       # 'Total INT Points': total_int_points,
-        'Total WF Points': total_wf_points,
-        'Total Combined Points': total_points
+        'Positions': fantasy_stats['positions_display'],
     }
+    row.update(point_totals)
+    # Actual counts are computed here once so the app does not have to decode them from points
+    row.update(count_totals)
+    return row
 
 def export_to_csv(player_data_list, filename='player_stats.csv'):
     """Export all player data to a CSV file."""
@@ -306,195 +313,387 @@ def export_to_csv(player_data_list, filename='player_stats.csv'):
         writer = csv.DictWriter(csvfile, fieldnames=field_names)
         writer.writeheader()
         writer.writerows(player_data_list)
+    report.record_output(filename, len(player_data_list))
 
     print(f"Data exported for {len(player_data_list)} players to '{filename}'")
 
-def generate_weekly_data(all_player_data, all_game_stats, all_team_data):
-    """Generate weekly CSV files from game data."""
-    print("\nGenerating weekly data...")
-    
-    # Group games by week
-    weekly_data = {}
+def aggregate_weekly_stats(game_stats, fantasy_stats, week_of):
+    """
+    Group a player's games by week (week_of maps a match ID to its week label, or None for
+    games outside the round calendar), totalling games played, points and raw stats.
+    """
+    weekly_totals = {}
     
-    for player_id, games in all_game_stats.items():
-        fantasy_stats = extract_fantasy_stats(all_player_data, player_id)
-        if not fantasy_stats:
+    for game in game_stats:
+        match_id = game.get('match_id')
+        if not match_id:
             continue
-            
-        for game in games:
-            match_id = game.get('match_id')
-            if not match_id:
-                continue
-                
-            week = determine_week_from_match_id(match_id)
-            
-            if week not in weekly_data:
-                weekly_data[week] = {}
-            
-            if player_id not in weekly_data[week]:
-                weekly_data[week][player_id] = {
-                    'fantasy_stats': fantasy_stats,
-                    'games': [],
-                    'total_points': 0
-                }
-            
-            # Calculate points for this individual game
-            game_points = calculate_game_points([game], fantasy_stats)
-            weekly_data[week][player_id]['games'].append(game)
-            weekly_data[week][player_id]['total_points'] += game_points
+        
+        week = week_of(match_id)
+        if week is None:
+            continue
+        
+        weekly_totals.setdefault(week, []).append(game)
+    
+    return {
+        week: {
+            'games': len(games),
+            'total_points': calculate_game_points(games, fantasy_stats),
+            'stats': {
+                stat: sum((game['stats'].get(stat) or 0) for game in games)
+                for stat in dict.fromkeys(stat for game in games for stat in game['stats'])
+            },
+        }
+        for week, games in weekly_totals.items()
+    }
+
+def format_weekly_row(player_id, fantasy_stats, week_totals):
+    """Build a weekly CSV row from a player's totals for that week."""
+    total_stats = week_totals['stats']
+    games_played = week_totals['games']
     
-    # Create weekly CSV files
-    os.makedirs('app/weekly_data', exist_ok=True)
+    return {
+        'Player ID': player_id,
+        'Name': fantasy_stats['name'],
+        'Team': fantasy_stats['team'],
+        'Cost': fantasy_stats['cost_display'],
+        'Positions': fantasy_stats['positions_display'],
+        'Games Played': games_played,
+        'Total Points': week_totals['total_points'],
+        'Average Points': round(week_totals['total_points'] / games_played, 2) if games_played else 0,
+        'Goals': total_stats.get('GL', 0),
+        'Assists': total_stats.get('ASS', 0),
+        'Minutes': total_stats.get('MIN', 0),
+        'Yellow Cards': total_stats.get('YC', 0),
+        'Red Cards': total_stats.get('RC', 0),
+        'Clean Sheets': total_stats.get('CS', 0),
+        'Goals Conceded': total_stats.get('GC', 0),
+        'Shots on Goal': total_stats.get('SGS', 0),
+        'Key Passes': total_stats.get('KP', 0)
+    }
+
+def weekly_filename(week, weekly_dir=WEEKLY_DATA_DIR):
+    """Return the CSV path for a week label such as 'Week 14'."""
+    return os.path.join(weekly_dir, f"{week.lower().replace(' ', '_')}_stats.csv")
+
+def written_weeks(weekly_dir=WEEKLY_DATA_DIR):
+    """Return the week labels of the weekly CSV files on disk."""
+    try:
+        filenames = os.listdir(weekly_dir)
+    except FileNotFoundError:
+        return []
+    weeks = []
+    for filename in filenames:
+        number = filename[len('week_'):-len('_stats.csv')]
+        if filename.startswith('week_') and filename.endswith('_stats.csv') and number.isdigit():
+            weeks.append(f"Week {number}")
+    return weeks
+
+def write_weekly_files(weekly_data, player_index, weeks=None, weekly_dir=WEEKLY_DATA_DIR):
+    """
+    Write weekly CSV files from {week: {player_id: week_totals}}.
+    Only the given weeks are written when weeks is set; a week left with no players is removed.
+    """
+    os.makedirs(weekly_dir, exist_ok=True)
     
-    for week, players_data in weekly_data.items():
-        week_filename = f"app/weekly_data/{week.lower().replace(' ', '_')}_stats.csv"
+    for week in (weeks if weeks is not None else weekly_data):
+        week_filename = weekly_filename(week, weekly_dir)
         weekly_player_list = []
         
-        for player_id, player_data in players_data.items():
-            fantasy_stats = player_data['fantasy_stats']
-            games = player_data['games']
-            
-            if not games:
+        for player_id, week_totals in weekly_data.get(week, {}).items():
+            fantasy_stats = extract_fantasy_stats(player_index, player_id)
+            if not fantasy_stats or not week_totals['games']:
                 continue
-            
-            # Calculate aggregate stats for the week
-            total_stats = {}
-            for game in games:
-                for stat, value in game['stats'].items():
-                    total_stats[stat] = total_stats.get(stat, 0) + (value or 0)
-            
-            # Get team name
-            squad_id = fantasy_stats.get('squad_id', 0)
-            team_name = all_team_data.get(squad_id, {}).get('name', 'Unknown Team')
-            
-            weekly_row = {
-                'Player ID': player_id,
-                'Name': f"{fantasy_stats['first_name']} {fantasy_stats['last_name']}",
-                'Team': team_name,
-                'Cost': f"${fantasy_stats['cost'] / 1_000_000:.1f}M",
-                'Positions': ', '.join(map(str, fantasy_stats['positions'])),
-                'Games Played': len(games),
-                'Total Points': player_data['total_points'],
-                'Average Points': round(player_data['total_points'] / len(games), 2) if games else 0,
-                'Goals': total_stats.get('GL', 0),
-                'Assists': total_stats.get('ASS', 0),
-                'Minutes': total_stats.get('MIN', 0),
-                'Yellow Cards': total_stats.get('YC', 0),
-                'Red Cards': total_stats.get('RC', 0),
-                'Clean Sheets': total_stats.get('CS', 0),
-                'Goals Conceded': total_stats.get('GC', 0),
-                'Shots on Goal': total_stats.get('SGS', 0),
-                'Key Passes': total_stats.get('KP', 0)
-            }
-            
-            weekly_player_list.append(weekly_row)
+            weekly_player_list.append(format_weekly_row(player_id, fantasy_stats, week_totals))
         
         if weekly_player_list:
             export_to_csv(weekly_player_list, week_filename)
-    
-    print(f"Generated weekly data for {len(weekly_data)} weeks")
-    return weekly_data
+        elif os.path.exists(week_filename):
+            os.remove(week_filename)
+            print(f"Removed '{week_filename}' (no players left in {week})")
 
 def calculate_game_points(game_stats, fantasy_stats):
     """Calculate fantasy points for specific games (used for weekly data)."""
-    total_points = 0
+    return sum(scoring_rules.game_points(game, fantasy_stats['positions']) for game in game_stats)
+
+def player_profile(fantasy_stats):
+    """Return the display fields a player's weekly rows repeat, which change without any new games."""
+    return [fantasy_stats['name'], fantasy_stats['team'], fantasy_stats['cost_display'],
+            fantasy_stats['positions_display']]
+
+def games_digest(game_stats):
+    """Return a stable digest of a player's match list and per-match stats."""
+    return hashlib.sha1(json.dumps(game_stats, sort_keys=True).encode('utf-8')).hexdigest()
+
+def score_player(game_stats, fantasy_stats, week_of):
+    """Score a player's games into the state entry kept between builds."""
+    return {
+        'match_ids': [game['match_id'] for game in game_stats],
+        'digest': games_digest(game_stats),
+        'positions': fantasy_stats['positions'],
+        'point_totals': calculate_point_totals(game_stats, fantasy_stats) if game_stats else None,
+        'counts': scoring_rules.count_totals(game_stats),
+        'weeks': aggregate_weekly_stats(game_stats, fantasy_stats, week_of),
+    }
+
+def score_players(game_stats_by_player, player_index, week_of):
+    """
+    Score several players into state entries at once.
+    Uses the vectorized NumPy engine when it is installed, otherwise score_player per player.
+    """
+    if scoring_engine is None:
+        return {
+            player_id: score_player(game_stats, player_index[player_id], week_of)
+            for player_id, game_stats in game_stats_by_player.items()
+        }
     
-    # Check player positions
-    is_defender = 'Defender' in fantasy_stats['positions']
-    is_goalkeeper = 'Goalkeeper' in fantasy_stats['positions']
-    is_midfielder = 'Midfielder' in fantasy_stats['positions']
-    is_defender_or_goalkeeper = is_defender or is_goalkeeper
+    scored = scoring_engine.score_league(list(game_stats_by_player), game_stats_by_player, player_index, week_of)
+    return {
+        player_id: {
+            'match_ids': [game['match_id'] for game in game_stats],
+            'digest': games_digest(game_stats),
+            'positions': player_index[player_id]['positions'],
+            **scored[player_id],
+        }
+        for player_id, game_stats in game_stats_by_player.items()
+    }
+
+def load_build_state(path=BUILD_STATE_FILE, rounds_digest=None):
+    """
+    Load the per-player state from the last build as {player_id: entry}.
+    State built against a different round calendar is discarded, since its weeks no longer apply.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        print(f"Ignoring unreadable build state '{path}'")
+        return {}
     
-    for game in game_stats:
-        goals_conceded = game['stats'].get('GC', 0)
-        min_played = game['stats'].get('MIN', 0)
-        
-        # Minutes played points
-        if min_played <= 60:
-            total_points += 1
-        else:
-            total_points += 2
-            
-        # Goal points
-        gl_points = game['stats'].get('GL', 0)
-        if is_defender_or_goalkeeper:
-            total_points += gl_points * 6
-        else:
-            total_points += gl_points * 5
-            
-        # Goals conceded (for defenders and goalkeepers only)
-        if is_defender_or_goalkeeper:
-            total_points += math.floor(goals_conceded / 2) * -1
-        
-        # Clean sheet points
-        if min_played >= 60 and goals_conceded == 0:
-            if is_defender_or_goalkeeper:
-                total_points += 5
-            elif is_midfielder:
-                total_points += 1
-        
-        # Goalkeeper specific points
-        if is_goalkeeper:
-            total_points += math.floor(game['stats'].get('GS', 0) // 4)
-            total_points += math.floor(game['stats'].get('PS', 0) * 5)
-        
-        # Other stats
-        total_points += math.floor(game['stats'].get('PM', 0) * -2)
-        total_points += math.floor(game['stats'].get('OG', 0) * -2)
-        total_points += math.floor(game['stats'].get('SGS', 0) // 4)
-        total_points += math.floor(game['stats'].get('FS', 0) // 4)
-        total_points += math.floor(game['stats'].get('PSS', 0) // 35)
-        total_points += math.floor(game['stats'].get('CRS', 0) // 3)
-        total_points += math.floor(game['stats'].get('KP', 0) // 4)
-        total_points += math.floor(game['stats'].get('CL', 0) // 4)
-        total_points += math.floor(game['stats'].get('WF', 0) // 4 * -1)
-        total_points += math.floor(game['stats'].get('ASS', 0) * 3)
-        total_points += math.floor(game['stats'].get('YC', 0) * -1)
-        total_points += math.floor(game['stats'].get('RC', 0) * -3)
+    if state.get('version') != BUILD_STATE_VERSION:
+        print(f"Build state '{path}' is from an older version, rebuilding everything")
+        return {}
+    if state.get('rounds') != rounds_digest:
+        print("The round calendar changed since the last build, rebuilding everything")
+        return {}
+    return {entry['id']: entry for entry in state.get('players', [])}
+
+def save_build_state(players_state, path=BUILD_STATE_FILE, rounds_digest=None):
+    """Persist the per-player state, and the round calendar it was built with, for the next incremental build."""
+    state = {
+        'version': BUILD_STATE_VERSION,
+        'rounds': rounds_digest,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'players': [dict(entry, id=player_id) for player_id, entry in players_state.items()],
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate MLS fantasy season and weekly CSVs.")
+    parser.add_argument('--workers', type=int, default=FETCH_WORKERS,
+                        help=f"concurrent requests for per-player stats (default: {FETCH_WORKERS})")
+    parser.add_argument('--timeout', type=float, default=FETCH_TIMEOUT,
+                        help=f"per-request timeout in seconds (default: {FETCH_TIMEOUT})")
+    parser.add_argument('--base-url', default=DATA_BASE_URL,
+                        help="base URL of the data feeds (default: $MLS_DATA_BASE_URL or the public S3 bucket)")
+    parser.add_argument('--cache-dir', default=FEED_CACHE_DIR,
+                        help=f"directory for cached raw feed responses (default: {FEED_CACHE_DIR})")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="download every feed in full without reading or writing the cache")
+    parser.add_argument('--offline', action='store_true',
+                        help="rebuild the CSVs from the cache only, without touching the network")
+    parser.add_argument('--fixtures', metavar='FILE',
+                        help="read the round calendar from a saved copy of the fixtures feed"
+                             " (see scripts/grab-fixtures.py) instead of fetching it")
+    parser.add_argument('--state-file', default=BUILD_STATE_FILE,
+                        help=f"per-player state used for incremental rebuilds (default: {BUILD_STATE_FILE})")
+    parser.add_argument('--full', action='store_true',
+                        help="ignore the saved state and refetch and rescore every player")
+    parser.add_argument('--report', default=BUILD_REPORT_FILE,
+                        help=f"where to write the JSON run report (default: {BUILD_REPORT_FILE})")
+    parser.add_argument('--profile-scoring', metavar='PATH',
+                        help="write a cProfile dump of the scoring stage (read it with pstats or snakeviz)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache_dir = None if args.no_cache else args.cache_dir
+    if args.offline and not cache_dir:
+        raise SystemExit("--offline needs the feed cache; drop --no-cache")
     
-    return total_points
+    report.reset()
+    report.info.update(offline=args.offline, cached=cache_dir is not None, full=args.full,
+                       engine='vectorized' if scoring_engine else 'per-game')
+    try:
+        build(args, cache_dir)
+        report.info['status'] = 'ok'
+    except BaseException as e:
+        report.info['status'] = f"failed: {e!r}"
+        raise
+    finally:
+        # Written even when the build fails, so slow or broken runs can be diagnosed afterwards
+        report.save(args.report)
+        print(f"📈 Run report: {args.report}")
 
-def main():
+def build(args, cache_dir):
     print("MLS Fantasy Data Generator")
     print("=" * 40)
+    if args.offline:
+        print(f"Offline mode: reading feeds from {cache_dir}")
     
-    # Fetch all team data once
-    print("Fetching team data...")
-    all_team_data = fetch_all_team_data()
+    session = None if args.offline else create_session(args.workers)
+    fetch_options = {'timeout': args.timeout, 'cache_dir': cache_dir, 'offline': args.offline}
     
-    # Fetch all player data once
-    print("Fetching player data...")
-    all_player_data = fetch_all_player_data()
+    with report.span('fetch_summaries'):
+        # Fetch all team data once
+        print("Fetching team data...")
+        with report.span('teams'):
+            all_team_data = fetch_all_team_data(session, args.base_url, **fetch_options)
+        
+        # Fetch all player data once
+        print("Fetching player data...")
+        with report.span('players'):
+            all_player_data = fetch_all_player_data(session, args.base_url, **fetch_options)
+        
+        # Fetch the round calendar that assigns each match to its week
+        print("Fetching fixtures...")
+        with report.span('fixtures'):
+            calendar = fetch_round_calendar(session, args.base_url, fixtures_file=args.fixtures, **fetch_options)
+    if not all_player_data:
+        # Without the summary every player would look delisted and all outputs would be pruned
+        raise SystemExit("No player data fetched; leaving the existing outputs and build state untouched")
+    if calendar is None:
+        print("⚠️  No fixtures available (pass --fixtures FILE to use a saved copy); falling back to the"
+              " static 2025 week ranges, which merge several rounds into one week")
+        calendar = StaticCalendar()
+    report.info.update(calendar='fixtures' if isinstance(calendar, RoundCalendar) else 'static',
+                       rounds=len(calendar))
     
-    # Extract player IDs
-    player_ids = [player['id'] for player in all_player_data]
+    # Normalize the players payload once into an ID-keyed index
+    with report.span('index'):
+        player_index = build_player_index(all_player_data, all_team_data)
+        player_ids = list(player_index)
+        players_state = {} if args.full else load_build_state(args.state_file, calendar.digest())
     
     # Process all players for complete data
     print(f"Processing {len(player_ids)} players...")
+    report.info['players'] = len(player_ids)
     
-    # Fetch game stats for all players at once
-    print("Fetching game stats for all players...")
-    all_game_stats = fetch_all_game_stats(player_ids)
+    # Every player's stats are revalidated, since the feed can correct past games without touching
+    # the players.json summary; with the feed cache an unchanged player costs a 304
+    print("Fetching game stats...")
+    failed_ids = set()
+    with report.span('fetch_game_stats', players=len(player_ids)):
+        all_game_stats = fetch_all_game_stats(player_ids, max_workers=args.workers, base_url=args.base_url,
+                                              session=session, failed=failed_ids, **fetch_options)
+    if session:
+        session.close()
+    report.info['failed_players'] = len(failed_ids)
     
-    # Generate season totals (original functionality)
-    print("\nGenerating season totals...")
-    player_results = []
-    for player_id in player_ids:
-        fantasy_stats = extract_fantasy_stats(all_player_data, player_id)
-        game_stats = all_game_stats.get(player_id, [])
+    # Rescore only players whose match list or stats actually changed
+    print("\nScoring changed players...")
+    with report.span('scoring') as scoring_span:
+        to_rescore = {}
+        for player_id in player_ids:
+            if player_id in failed_ids:
+                # Keep the previous entry; the player is fetched again next run
+                continue
+            
+            game_stats = all_game_stats[player_id]
+            previous = players_state.get(player_id)
+            if (previous and previous['digest'] == games_digest(game_stats)
+                    and previous['positions'] == player_index[player_id]['positions']):
+                continue
+            to_rescore[player_id] = game_stats
+        report.info['changed_players'] = len(to_rescore)
+        scoring_span.details['players'] = len(to_rescore)
+        scoring_span.details['games'] = sum(len(game_stats) for game_stats in to_rescore.values())
+        
+        profiler = cProfile.Profile() if args.profile_scoring else None
+        if profiler:
+            profiler.enable()
+        scored = score_players(to_rescore, player_index, calendar.week_of)
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile_scoring)
+            scoring_span.details['profile'] = args.profile_scoring
+        
+        affected_weeks = set()
+        for player_id, entry in scored.items():
+            affected_weeks.update(entry['weeks'])
+            if player_id in players_state:
+                affected_weeks.update(players_state[player_id]['weeks'])
+            players_state[player_id] = entry
         
-        if fantasy_stats and game_stats:
-            player_result = calculate_player_points(game_stats, fantasy_stats, all_team_data)
-            player_results.append(player_result)
+        # Drop players that are no longer listed
+        for player_id in set(players_state) - set(player_index):
+            affected_weeks.update(players_state.pop(player_id)['weeks'])
+    print(f"Rescored {len(to_rescore)} players"
+          f" ({'vectorized engine' if scoring_engine else 'per-game scoring'})")
     
-    # Export season totals to main CSV
-    export_to_csv(player_results, 'player_stats.csv')
+    # Games of these matches count towards season totals but are left out of the weekly files
+    report.info.update(invalid_match_ids=len(calendar.invalid_ids), unassigned_matches=len(calendar.unassigned_ids))
+    if calendar.invalid_ids:
+        examples = ', '.join(map(str, sorted(calendar.invalid_ids, key=str)[:5]))
+        print(f"⚠️  {len(calendar.invalid_ids)} match IDs are not YYYYMMDD dates and were left out of the"
+              f" weekly files (e.g. {examples})")
+    if calendar.unassigned_ids:
+        print(f"{len(calendar.unassigned_ids)} matches fall before the first round and count towards"
+              f" season totals only")
+    
+    with report.span('season_export'):
+        # Season totals are cheap to reassemble; costs and ownership change for everyone each run
+        player_results = []
+        for player_id in player_ids:
+            entry = players_state.get(player_id)
+            
+            if entry and entry['point_totals'] is not None:
+                player_results.append(format_season_row(player_index[player_id], entry['point_totals'], entry['counts']))
+        
+        # Export season totals to main CSV, plus the columnar copy the app memory-maps
+        with report.span('csv'):
+            export_to_csv(player_results, 'player_stats.csv')
+        if player_results:
+            with report.span('columnar'):
+                columnar.write_table('player_stats.bin', player_results)
+            report.record_output('player_stats.bin', len(player_results))
+    
+    # Rewrite only the weekly files touched by rescored players (and any that went missing)
+    with report.span('weekly_export') as weekly_span:
+        # A transfer or price change alters the player's rows in every week they played
+        for player_id in player_ids:
+            entry = players_state.get(player_id)
+            if entry is None:
+                continue
+            profile = player_profile(player_index[player_id])
+            if entry.get('profile') != profile:
+                affected_weeks.update(entry['weeks'])
+                entry['profile'] = profile
+        
+        weekly_data = {}
+        for player_id in player_ids:
+            for week, week_totals in players_state.get(player_id, {}).get('weeks', {}).items():
+                weekly_data.setdefault(week, {})[player_id] = week_totals
+        missing_weeks = {week for week in weekly_data if not os.path.exists(weekly_filename(week))}
+        # Files of weeks no longer in the calendar (or from a discarded build state) are removed
+        stale_weeks = set(written_weeks()) - set(weekly_data)
+        weeks_to_write = sorted(affected_weeks | missing_weeks | stale_weeks, key=lambda week: int(week.split()[-1]))
+        weekly_span.details['weeks'] = len(weeks_to_write)
+        
+        print("\nGenerating weekly data...")
+        write_weekly_files(weekly_data, player_index, weeks=weeks_to_write)
+        print(f"Updated {len(weeks_to_write)} weekly files ({len(weekly_data)} weeks in total)")
     
-    # Generate weekly data
-    weekly_data = generate_weekly_data(all_player_data, all_game_stats, all_team_data)
+    with report.span('save_state'):
+        save_build_state(players_state, args.state_file, calendar.digest())
     
     print(f"\n✅ Generation complete!")
-    print(f"📊 Season totals: player_stats.csv ({len(player_results)} players)")
+    print(f"📊 Season totals: player_stats.csv + player_stats.bin ({len(player_results)} players)")
     print(f"📅 Weekly data: app/weekly_data/ ({len(weekly_data)} weeks)")
     print(f"🎯 Ready for weekly filtering in your app!")
 
@@ -0,0 +1,127 @@
+"""
+Round calendar for combine.py, built from the fixtures feed (rounds.json).
+
+The feed lists every round of the season with its start date. Sorted by start, those dates
+form a boundary table: a match belongs to the last round that starts on or before the match
+date, found with a binary search in O(log R) for R rounds, so any season's calendar works
+without code changes. Match IDs are the match date in YYYYMMDD form, as in the per-player
+stats feed; matches before the first round (earlier seasons) belong to no round.
+
+When neither the feed nor a cached copy is available, StaticCalendar falls back to the fixed
+2025 date ranges combine.py used before the feed was read.
+"""
+import hashlib
+import json
+from bisect import bisect_right
+from datetime import datetime
+
+FIXTURES_FEED = 'rounds.json'
+
+def date_key(value):
+    """Return a date as a YYYYMMDD integer: '2025-02-22T19:30:00+00:00', '2025-02-22' or 20250222."""
+    text = str(value)
+    if text[4:5] == '-':
+        text = text[:10].replace('-', '')
+    return int(text[:8])
+
+def match_date_key(match_id):
+    """Return a match ID's date as a YYYYMMDD integer, or None if it is not a valid YYYYMMDD date."""
+    text = str(match_id)
+    if len(text) != 8 or not text.isdigit():
+        return None
+    try:
+        datetime.strptime(text, '%Y%m%d')
+    except ValueError:
+        return None
+    return int(text)
+
+def week_label(round_number):
+    """15 -> 'Week 15', the label used in build state and weekly file names."""
+    return f"Week {round_number}"
+
+class WeekLookup:
+    """
+    Match-to-week lookup shared by the calendars. Each match ID is shared by the players of
+    both teams, so it is resolved once; IDs that are not dates and matches no week covers
+    are collected so the build can report the games it left out of the weekly files.
+    """
+
+    def __init__(self):
+        self._match_weeks = {}
+        self.invalid_ids = set()
+        self.unassigned_ids = set()
+
+    def week_of(self, match_id):
+        """Return the week label of a match, or None if its ID is not a date or no week covers it."""
+        try:
+            return self._match_weeks[match_id]
+        except KeyError:
+            pass
+        key = match_date_key(match_id)
+        if key is None:
+            week = None
+            self.invalid_ids.add(match_id)
+        else:
+            week = self.week_of_date(key)
+            if week is None:
+                self.unassigned_ids.add(match_id)
+        self._match_weeks[match_id] = week
+        return week
+
+    def week_of_date(self, key):
+        raise NotImplementedError
+
+class RoundCalendar(WeekLookup):
+    """Round start dates in order, with the match-to-week lookup."""
+
+    def __init__(self, boundaries):
+        """boundaries: (start date key, round number) pairs, in any order."""
+        super().__init__()
+        boundaries = sorted(boundaries)
+        self.starts = [start for start, _ in boundaries]
+        self.weeks = [week_label(number) for _, number in boundaries]
+
+    @classmethod
+    def from_feed(cls, rounds):
+        """Build the calendar from rounds.json entries ({'id': round number, 'start': date, ...})."""
+        return cls((date_key(entry['start']), int(entry['id'])) for entry in rounds if entry.get('start'))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def week_of_date(self, key):
+        """Return the week label of the round covering a YYYYMMDD date, or None before the first round."""
+        index = bisect_right(self.starts, key) - 1
+        return self.weeks[index] if index >= 0 else None
+
+    def digest(self):
+        """Return a digest of the boundaries, saved with the build state to detect a rescheduled calendar."""
+        boundaries = json.dumps(list(zip(self.starts, self.weeks)))
+        return hashlib.sha1(boundaries.encode('utf-8')).hexdigest()
+
+class StaticCalendar(WeekLookup):
+    """
+    The fixed mapping from before the fixtures feed: roughly monthly 2025 ranges for weeks
+    1-12, later dates spread over weeks 13-28 and earlier dates folded into 1-28. It merges
+    rounds, so it is only used when no fixtures are available.
+    """
+    # Last date of each of weeks 1-12
+    WEEK_ENDS = (20250115, 20250215, 20250315, 20250415, 20250515, 20250615,
+                 20250715, 20250815, 20250915, 20251015, 20251115, 20251215)
+    NUM_WEEKS = 28
+
+    def __len__(self):
+        return self.NUM_WEEKS
+
+    def week_of_date(self, key):
+        if key < 20250000:
+            week = key % self.NUM_WEEKS + 1
+        elif key <= self.WEEK_ENDS[-1]:
+            week = next(number for number, end in enumerate(self.WEEK_ENDS, 1) if key <= end)
+        else:
+            week = (key - self.WEEK_ENDS[-1]) // 100 + 13
+        return week_label(max(1, min(self.NUM_WEEKS, week)))
+
+    def digest(self):
+        """A fixed digest, so switching between this and a fixtures calendar discards the build state."""
+        return hashlib.sha1(b'static-2025').hexdigest()
@@ -0,0 +1,156 @@
+"""
+Columnar NumPy scoring engine for combine.py.
+
+Every game for every player is loaded into one players x games x stats integer matrix,
+each rule in scoring_rules.SCORING_RULES is applied to the whole league with vectorized
+integer operations and per-player multipliers, and season and weekly totals are both
+reduced from the same per-game points array. Results match the per-game scorer exactly;
+both read stats the feed reports as null as zero.
+"""
+import numpy as np
+
+import scoring_rules  # from app/, which combine.py puts on sys.path
+
+# Raw stats reported in the weekly CSVs
+WEEKLY_STAT_CODES = ('GL', 'ASS', 'MIN', 'YC', 'RC', 'CS', 'GC', 'SGS', 'KP')
+# Raw stat codes loaded into the matrix, in column order
+STAT_CODES = tuple(dict.fromkeys(scoring_rules.STAT_CODES + WEEKLY_STAT_CODES))
+STAT_COLUMN = {code: column for column, code in enumerate(STAT_CODES)}
+POINT_COLUMNS = scoring_rules.POINT_COLUMNS
+
+def load_game_matrix(player_ids, all_game_stats, week_of):
+    """
+    Load all games into dense arrays padded to the longest match list.
+    Returns (stats, played, week_index, week_labels): stats is int64 (players, games, stats),
+    played marks the real (non-padding) games and week_index maps each game to week_labels,
+    where a None label collects the games week_of places in no week.
+    """
+    max_games = max((len(all_game_stats.get(player_id, [])) for player_id in player_ids), default=0)
+    stats = np.zeros((len(player_ids), max_games, len(STAT_CODES)), dtype=np.int64)
+    played = np.zeros((len(player_ids), max_games), dtype=bool)
+    week_index = np.zeros((len(player_ids), max_games), dtype=np.int64)
+
+    week_labels = []
+    week_lookup = {}
+    match_weeks = {}  # many players share a match, so resolve each match_id once
+    missing = (0,) * len(STAT_CODES)
+    player_slots, game_slots, game_weeks, values = [], [], [], []
+    for player_slot, player_id in enumerate(player_ids):
+        for game_slot, game in enumerate(all_game_stats.get(player_id, [])):
+            match_id = game['match_id']
+            if match_id not in match_weeks:
+                week = week_of(match_id)
+                if week not in week_lookup:
+                    week_lookup[week] = len(week_labels)
+                    week_labels.append(week)
+                match_weeks[match_id] = week_lookup[week]
+
+            player_slots.append(player_slot)
+            game_slots.append(game_slot)
+            game_weeks.append(match_weeks[match_id])
+            values.extend(map(game['stats'].get, STAT_CODES, missing))
+
+    if values:
+        try:
+            game_values = np.array(values, dtype=np.int64)
+        except TypeError:
+            # Stats reported as null count as zero
+            game_values = np.array([value or 0 for value in values], dtype=np.int64)
+        stats[player_slots, game_slots] = game_values.reshape(-1, len(STAT_CODES))
+        played[player_slots, game_slots] = True
+        week_index[player_slots, game_slots] = game_weeks
+    return stats, played, week_index, week_labels
+
+def rule_multipliers(player_ids, player_index):
+    """Return an int64 (players, rules) array of each rule's multiplier for each player."""
+    return np.array([
+        [scoring_rules.rule_multiplier(rule, player_index[player_id]['positions'])
+         for rule in scoring_rules.SCORING_RULES]
+        for player_id in player_ids
+    ], dtype=np.int64).reshape(len(player_ids), len(scoring_rules.SCORING_RULES))
+
+def condition_mask(stats, conditions):
+    """Return a boolean (players, games) mask of the games meeting every condition."""
+    mask = np.ones(stats.shape[:2], dtype=bool)
+    for code, op, value in conditions:
+        mask &= scoring_rules.OPERATORS[op](stats[..., STAT_COLUMN[code]], value)
+    return mask
+
+def stat_values(stats, code):
+    """Return the (players, games) values of a stat, or ones for rules counted per game."""
+    return stats[..., STAT_COLUMN[code]] if code else np.ones(stats.shape[:2], dtype=np.int64)
+
+def score_game_matrix(stats, played, multipliers):
+    """Apply every scoring rule to every game, returning points as (players, games, POINT_COLUMNS)."""
+    points = np.zeros(stats.shape[:2] + (len(POINT_COLUMNS),), dtype=np.int64)
+    for rule_index, rule in enumerate(scoring_rules.SCORING_RULES):
+        rule_points = (stat_values(stats, rule.stat) // rule.divisor) * multipliers[:, rule_index, None]
+        if rule.conditions:
+            rule_points *= condition_mask(stats, rule.conditions)
+        points[..., scoring_rules.COLUMN_INDEX[rule.column]] += rule_points
+
+    # Padding slots score nothing
+    return points * played[..., None]
+
+def count_game_matrix(stats, played):
+    """Return the actual count contributions as (players, games, COUNT_COLUMNS)."""
+    counts = np.stack([
+        stat_values(stats, count.stat) * condition_mask(stats, count.conditions)
+        for count in scoring_rules.COUNT_COLUMNS
+    ], axis=-1)
+    return counts * played[..., None]
+
+def score_league(player_ids, all_game_stats, player_index, week_of):
+    """
+    Score all players in one pass.
+    Returns {player_id: {'point_totals': ..., 'counts': ..., 'weeks': ...}} in the shapes
+    produced by calculate_point_totals (None for players without games),
+    scoring_rules.count_totals and aggregate_weekly_stats.
+    """
+    player_ids = list(player_ids)
+    stats, played, week_index, week_labels = load_game_matrix(player_ids, all_game_stats, week_of)
+    points = score_game_matrix(stats, played, rule_multipliers(player_ids, player_index))
+    counts = count_game_matrix(stats, played)
+
+    season_points = points.sum(axis=1)
+    season_counts = counts.sum(axis=1).tolist()
+    game_points = points.sum(axis=2)
+
+    # Weekly totals: scatter each real game into its (player, week) bucket
+    num_weeks = len(week_labels)
+    buckets = (np.arange(len(player_ids))[:, None] * num_weeks + week_index)[played]
+    week_games = np.bincount(buckets, minlength=len(player_ids) * num_weeks)
+    week_points = np.zeros(len(player_ids) * num_weeks, dtype=np.int64)
+    np.add.at(week_points, buckets, game_points[played])
+    week_stats = np.zeros((len(player_ids) * num_weeks, len(STAT_CODES)), dtype=np.int64)
+    np.add.at(week_stats, buckets, stats[played])
+
+    week_games = week_games.reshape(len(player_ids), num_weeks).tolist()
+    week_points = week_points.reshape(len(player_ids), num_weeks).tolist()
+    week_stats = week_stats.reshape(len(player_ids), num_weeks, len(STAT_CODES)).tolist()
+    count_columns = [count.column for count in scoring_rules.COUNT_COLUMNS]
+    has_games = played.any(axis=1).tolist()
+
+    results = {}
+    for player_slot, player_id in enumerate(player_ids):
+        point_totals = None
+        if has_games[player_slot]:
+            totals = season_points[player_slot].tolist()
+            point_totals = dict(zip(POINT_COLUMNS, totals))
+            point_totals[scoring_rules.COMBINED_COLUMN] = sum(totals)
+
+        weeks = {}
+        for week_slot, games in enumerate(week_games[player_slot]):
+            if games and week_labels[week_slot] is not None:
+                weeks[week_labels[week_slot]] = {
+                    'games': games,
+                    'total_points': week_points[player_slot][week_slot],
+                    'stats': dict(zip(STAT_CODES, week_stats[player_slot][week_slot])),
+                }
+
+        results[player_id] = {
+            'point_totals': point_totals,
+            'counts': dict(zip(count_columns, season_counts[player_slot])),
+            'weeks': weeks,
+        }
+    return results
@@ -0,0 +1,29 @@
+import json
+import sys
+
+import requests
+
+# Fixtures feed: every round of the season with its start and end dates
+url = "https://fgp-data-us.s3.us-east-1.amazonaws.com/json/mls_mls/rounds.json"
+
+def fetch_fixtures():
+    """Fetch the rounds of the current season."""
+    response = requests.get(url)
+    if response.status_code == 200:
+        return response.json()
+    print(f"Failed to fetch fixtures, status code: {response.status_code}")
+    return None
+
+def save_fixtures(rounds, filename):
+    """Save the feed as is, for combine.py --fixtures."""
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(rounds, f, indent=2)
+    print(f"Saved {len(rounds)} rounds to '{filename}'")
+
+if __name__ == '__main__':
+    rounds = fetch_fixtures()
+    if rounds:
+        for round_info in sorted(rounds, key=lambda entry: entry.get('start') or ''):
+            print(f"Round {round_info['id']}: {round_info.get('start')} to {round_info.get('end')}"
+                  f" ({len(round_info.get('games', []))} games, {round_info.get('status', 'unknown')})")
+        save_fixtures(rounds, sys.argv[1] if len(sys.argv) > 1 else 'fixtures.json')